@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import bruch
+
+
+def legacy_radial_profile(contour):
+    M = cv2.moments(contour)
+    if M["m00"] == 0:
+        return None, (0, 0)
+
+    cx = int(M["m10"] / M["m00"])
+    cy = int(M["m01"] / M["m00"])
+
+    distances = []
+    for point in contour:
+        px, py = point[0]
+        distances.append(np.sqrt((px - cx) ** 2 + (py - cy) ** 2))
+
+    return np.array(distances), (cx, cy)
+
+
+def legacy_outer_distances(outer_contour, cX, cY):
+    dists_outer = []
+    for p in outer_contour:
+        dists_outer.append(np.sqrt((p[0][0] - cX) ** 2 + (p[0][1] - cY) ** 2))
+    return np.array(dists_outer)
+
+
+def legacy_find_windows(contours_all, hierarchy, cX, cY):
+    valid_windows = []
+    if hierarchy is not None:
+        for i, cnt in enumerate(contours_all):
+            if hierarchy[0][i][3] != -1 and cv2.contourArea(cnt) > bruch.MIN_WINDOW_AREA:
+                Mh = cv2.moments(cnt)
+                if Mh["m00"] != 0:
+                    hx, hy = int(Mh["m10"] / Mh["m00"]), int(Mh["m01"] / Mh["m00"])
+                    if np.sqrt((hx - cX) ** 2 + (hy - cY) ** 2) > 30:
+                        valid_windows.append(cnt)
+    return valid_windows
+
+
+def extract_contours(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+    kernel = np.ones((3, 3), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+    contours_ext, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    if not contours_ext:
+        return None
+    outer = max(contours_ext, key=cv2.contourArea)
+    (x_fl, y_fl), _ = cv2.minEnclosingCircle(outer)
+    contours_all, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+    return outer, (int(x_fl), int(y_fl)), contours_all, hierarchy
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(image_dir, repeat):
+    totals = {"outer_alt": 0.0, "outer_neu": 0.0, "fenster_alt": 0.0, "fenster_neu": 0.0, "profil_alt": 0.0, "profil_neu": 0.0}
+    mismatches = 0
+    classes = {}
+    count = 0
+
+    for root, dirs, files in os.walk(image_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                continue
+            image = cv2.imread(os.path.join(root, file_name))
+            if image is None:
+                continue
+            extracted = extract_contours(image)
+            if extracted is None:
+                continue
+            outer, (cX, cY), contours_all, hierarchy = extracted
+            count += 1
+
+            t, old = timed(lambda: legacy_outer_distances(outer, cX, cY), repeat)
+            totals["outer_alt"] += t
+            t, new = timed(lambda: bruch.radial_distances(outer, (cX, cY)), repeat)
+            totals["outer_neu"] += t
+            mismatches += not np.array_equal(old, new)
+
+            t, old_w = timed(lambda: legacy_find_windows(contours_all, hierarchy, cX, cY), repeat)
+            totals["fenster_alt"] += t
+            t, new_w = timed(lambda: bruch.find_windows(contours_all, hierarchy, (cX, cY)), repeat)
+            totals["fenster_neu"] += t
+            mismatches += len(old_w) != len(new_w) or any(a is not b for a, b in zip(old_w, new_w))
+
+            for w_cnt in new_w:
+                t, old_p = timed(lambda: legacy_radial_profile(w_cnt), repeat)
+                totals["profil_alt"] += t
+                t, new_p = timed(lambda: bruch.get_radial_profile(w_cnt), repeat)
+                totals["profil_neu"] += t
+                mismatches += not np.array_equal(old_p[0], new_p[0]) or old_p[1] != new_p[1]
+
+            cat, _ = bruch.analyze_snack_geometry(image)
+            classes[cat] = classes.get(cat, 0) + 1
+
+    print(f"[bruch_geometrie.py] {count} Bilder, {repeat} Wiederholungen pro Messung")
+    for name in ["outer", "fenster", "profil"]:
+        old, new = totals[f"{name}_alt"], totals[f"{name}_neu"]
+        speedup = old / new if new > 0 else 0
+        print(f"   {name:<8} alt: {old * 1000:8.2f} ms | neu: {new * 1000:8.2f} ms | Faktor {speedup:.1f}x")
+    print(f"   Klassifikation: {classes}")
+    print(f"   Abweichungen: {mismatches}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mikrobenchmark der Konturgeometrie in bruch.py (alt vs. vektorisiert).")
+    parser.add_argument("image_dir", help="Ordner mit segmentierten 400x400 Bildern, z.B. output/processed")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.image_dir, args.repeat) else 0)
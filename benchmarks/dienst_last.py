@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetik
+from scripts import dienst
+from scripts import schnittstelle
+
+
+def load_images(source_dir, count, height, seed):
+    if source_dir:
+        paths = [
+            os.path.join(root, f)
+            for root, _, files in sorted(os.walk(source_dir))
+            for f in sorted(files)
+            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ]
+        return [(open(p, 'rb').read(), os.path.splitext(p)[1].lower()) for p in paths[:count]]
+
+    images = []
+    for i in range(count):
+        kind = synthetik.KINDS[i % len(synthetik.KINDS)]
+        _, encoded = cv2.imencode(".jpg", synthetik.snack_for_kind(kind, height, seed + i))
+        images.append((encoded.tobytes(), ".jpg"))
+    return images
+
+
+def post(url, data, ext):
+    request = urllib.request.Request(f"{url}/pruefen?ext={ext}", data=data, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def start_server(workers, batch_size, wait_ms):
+    started = threading.Event()
+    holder = {}
+
+    def ready(server):
+        holder["server"] = server
+        started.set()
+
+    thread = threading.Thread(
+        target=dienst.run_server,
+        kwargs={"port": 0, "workers": workers, "batch_size": batch_size, "batch_wait_ms": wait_ms, "ready": ready},
+    )
+    thread.start()
+    started.wait()
+    server = holder["server"]
+    return f"http://{dienst.HOST}:{server.server_address[1]}", server, thread
+
+
+def run(images, workers, batch_sizes, clients, wait_ms):
+    reference = [schnittstelle.classify(data, ext) for data, ext in images]
+    mismatches = 0
+
+    for size in batch_sizes:
+        url, server, thread = start_server(workers, size, wait_ms)
+        post(url, *images[0])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(lambda job: post(url, *job), images))
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        thread.join()
+
+        mismatches += sum(ref != got["objekte"] for ref, got in zip(reference, results))
+        latencies = sorted(r["ms"] for r in results)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"   Stapel {size:<3} | {len(images) / elapsed:7.1f} Bilder/s | Latenz Mittel "
+              f"{sum(latencies) / len(latencies):7.1f} ms, p95 {p95:7.1f} ms")
+
+    print(f"   Abweichende Urteile gegenüber schnittstelle.classify: {mismatches}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lasttest des HTTP-Prüfdienstes (dienst.py) mit gleichzeitigen Anfragen.")
+    parser.add_argument("source", nargs="?", help="Ordner mit Rohbildern (Standard: synthetische Snacks)")
+    parser.add_argument("--count", type=int, default=48)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--wait-ms", type=float, default=dienst.BATCH_WAIT_MS)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    images = load_images(args.source, args.count, args.height, args.seed)
+    print(f"[dienst_last.py] {len(images)} Bilder, {args.clients} Clients, {args.workers} Worker")
+    sys.exit(1 if run(images, args.workers, args.batch_sizes, args.clients, args.wait_ms) else 0)
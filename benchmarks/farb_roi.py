@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.kaskade_vergleich import folder_images
+from benchmarks.stapel import warped_images
+from scripts import farb
+from tests.referenz import full_frame_defects
+
+
+def roi_defects(image, spot_threshold=43):
+    return farb.detect_defects(image, spot_threshold=spot_threshold)
+
+
+def same_result(a, b):
+    return (
+        a["is_defective"] == b["is_defective"]
+        and a["spot_area"] == b["spot_area"]
+        and len(a["contours"]) == len(b["contours"])
+        and all(np.array_equal(x, y) for x, y in zip(a["contours"], b["contours"]))
+    )
+
+
+def timed_results(func, images, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(image, farb.SPOT_THRESHOLD) for image in images]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def run(images, repeat, scales):
+    print(f"[farb_roi.py] {len(images)} entzerrte Bilder")
+    t_full, reference = timed_results(full_frame_defects, images, repeat)
+    print(f"   Gesamtbild           {t_full * 1000:8.2f} ms | {t_full / len(images) * 1000:6.3f} ms/Bild")
+
+    t_roi, results = timed_results(roi_defects, images, repeat)
+    mismatches = sum(not same_result(a, b) for a, b in zip(reference, results))
+    print(f"   Objektausschnitt     {t_roi * 1000:8.2f} ms | {t_roi / len(images) * 1000:6.3f} ms/Bild "
+          f"| Faktor {t_full / t_roi:5.2f} | abweichend: {mismatches}")
+
+    default_scale = farb.BLACKHAT_SCALE
+    try:
+        for scale in scales:
+            farb.BLACKHAT_SCALE = scale
+            t_scaled, scaled = timed_results(roi_defects, images, repeat)
+            flipped = sum(a["is_defective"] != b["is_defective"] for a, b in zip(reference, scaled))
+            print(f"   Blackhat x{scale:<9.2f} {t_scaled * 1000:8.2f} ms | {t_scaled / len(images) * 1000:6.3f} ms/Bild "
+                  f"| Faktor {t_full / t_scaled:5.2f} | andere Urteile: {flipped}")
+    finally:
+        farb.BLACKHAT_SCALE = default_scale
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prüft, dass die Farbprüfung auf dem Objektausschnitt dieselben Flecken findet wie auf dem Gesamtbild.")
+    parser.add_argument("ordner", nargs="?", help="Ordner mit entzerrten Bildern, z.B. output/processed (sonst synthetisch)")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scales", type=float, nargs="*", default=[0.5])
+    args = parser.parse_args()
+
+    images = folder_images(args.ordner) if args.ordner else warped_images(args.count, args.height, args.seed)
+    sys.exit(1 if run(images, args.repeat, args.scales) else 0)
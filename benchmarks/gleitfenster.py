@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import bruch
+
+
+def legacy_local_variance(distances, window_size=20):
+    padded = np.pad(distances, (window_size // 2, window_size // 2), mode='wrap')
+    local_std = []
+    for i in range(len(distances)):
+        local_std.append(np.std(padded[i: i + window_size]))
+    return np.array(local_std)
+
+
+def legacy_count_peaks(values, window=10, min_dist=200):
+    n = len(values)
+    if n < window:
+        return 0
+
+    smoothed = np.convolve(values, np.ones(window) / window, mode='same')
+
+    candidates = []
+    lookahead = 5
+    padded = np.pad(smoothed, (lookahead, lookahead), mode='wrap')
+
+    for i in range(n):
+        current_val = padded[i + lookahead]
+        segment = padded[i: i + 2 * lookahead + 1]
+        if current_val == np.max(segment) and current_val > np.min(segment) + 2:
+            if np.argmax(segment) == lookahead:
+                candidates.append((i, current_val))
+
+    candidates.sort(key=lambda x: x[1], reverse=True)
+
+    final_peaks = []
+    for idx, val in candidates:
+        is_too_close = False
+        for kept_idx in final_peaks:
+            dist = abs(idx - kept_idx)
+            if min(dist, n - dist) < min_dist:
+                is_too_close = True
+                break
+        if not is_too_close:
+            final_peaks.append(idx)
+
+    return len(final_peaks)
+
+
+def synthetic_profile(rng, n, corners):
+    angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    radius = 60 + 12 * np.cos(corners * angles) + rng.normal(0, 1.5, n)
+    return np.round(radius, 1)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run(lengths, samples, seed):
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+
+    print(f"[gleitfenster.py] {samples} Signale pro Länge")
+    for n in lengths:
+        t_var_old = t_var_new = t_peak_old = t_peak_new = 0.0
+        max_std_diff = 0.0
+
+        for _ in range(samples):
+            signal = synthetic_profile(rng, n, int(rng.integers(3, 7)))
+
+            t, old = timed(legacy_local_variance, signal, 15)
+            t_var_old += t
+            t, new = timed(bruch.check_local_variance, signal, 15)
+            t_var_new += t
+            max_std_diff = max(max_std_diff, float(np.max(np.abs(old - new))))
+
+            t, old = timed(legacy_count_peaks, signal, 8, bruch.MIN_PEAK_DISTANCE)
+            t_peak_old += t
+            t, new = timed(bruch.count_peaks, signal, 8, bruch.MIN_PEAK_DISTANCE)
+            t_peak_new += t
+            mismatches += old != new
+
+        print(f"   n={n:<6} Varianz alt {t_var_old * 1000:8.2f} ms | neu {t_var_new * 1000:7.2f} ms "
+              f"| max. Abweichung {max_std_diff:.1e}")
+        print(f"   {'':<8} Peaks   alt {t_peak_old * 1000:8.2f} ms | neu {t_peak_new * 1000:7.2f} ms")
+
+    print(f"   Abweichende Peak-Zahlen: {mismatches}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mikrobenchmark der Gleitfenster-Statistiken (alt vs. gleitfenster.py).")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.lengths, args.samples, args.seed) else 0)
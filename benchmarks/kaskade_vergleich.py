@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stapel import warped_images
+from scripts import kaskade
+from scripts import metriken
+from tests.referenz import comparable, legacy_classify
+
+
+def folder_images(folder):
+    images = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                image = cv2.imread(os.path.join(root, file_name))
+                if image is not None:
+                    images.append(image)
+    return images
+
+
+def timed_records(func, images, *args):
+    start = time.perf_counter()
+    records = [func(image, *args) for image in images]
+    return time.perf_counter() - start, records
+
+
+def run(images):
+    metriken.enable()
+    t_legacy, legacy = timed_records(legacy_classify, images)
+    t_same, same_order = timed_records(kaskade.classify, images, None, None, kaskade.LEGACY_ORDER)
+    metriken.reset()
+    t_cascade, cascade = timed_records(kaskade.classify, images)
+    skipped = metriken.summary()["stages"].get("kaskade", {}).get("branches", {})
+
+    legacy_counts = Counter(r["category"] for r in legacy)
+    cascade_counts = Counter(r["category"] for r in cascade)
+    class_mismatches = sum(a["category"] != b["category"] for a, b in zip(legacy, cascade))
+    record_mismatches = sum(comparable(a) != comparable(b) for a, b in zip(legacy, same_order))
+
+    print(f"[kaskade_vergleich.py] {len(images)} Bilder, Reihenfolge {kaskade.check_order()}")
+    print(f"   Bisher (fest)            {t_legacy * 1000:8.1f} ms | {dict(sorted(legacy_counts.items()))}")
+    print(f"   Kaskade (alte Folge)     {t_same * 1000:8.1f} ms | abweichende Datensätze: {record_mismatches}")
+    print(f"   Kaskade (nach Kosten)    {t_cascade * 1000:8.1f} ms | {dict(sorted(cascade_counts.items()))}")
+    for name, count in sorted(skipped.items()):
+        print(f"   -> {name}: {count}")
+    print(f"   Abweichende Klassen: {class_mismatches}")
+    return class_mismatches + record_mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prüft, dass die Kaskade dieselben Klassen liefert wie die feste Reihenfolge.")
+    parser.add_argument("ordner", nargs="?", help="Ordner mit entzerrten Bildern, z.B. output/processed (sonst synthetisch)")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    images = folder_images(args.ordner) if args.ordner else warped_images(args.count, args.height, args.seed)
+    sys.exit(1 if run(images) else 0)
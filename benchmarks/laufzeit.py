@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetik
+from scripts import segmentierung
+from scripts import bruch
+from scripts import rest
+from scripts import farb
+from scripts import symmetrie
+from scripts import pipeline
+from scripts import merkmale
+
+
+def summarize(samples):
+    values = np.array(samples) * 1000
+    if len(values) == 0:
+        return {"n": 0}
+    return {
+        "n": int(len(values)),
+        "mean_ms": round(float(values.mean()), 3),
+        "median_ms": round(float(np.median(values)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "min_ms": round(float(values.min()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run_all_checks(image, symmetry_engine=None, shared=True):
+    features = merkmale.for_image(image) if shared else None
+    bruch.analyze_snack_geometry(image, features)
+    rest.check_complexity(image, features)
+    farb.detect_defects(image, farb.SPOT_THRESHOLD, features=features)
+    symmetrie.get_symmetry_score(image, symmetry_engine, features)
+
+
+def bench_stages(images, repeat=1, symmetry_engine=None):
+    stages = {
+        "run_preprocessing": [],
+        "analyze_snack_geometry": [],
+        "calculate_edge_sum": [],
+        "detect_defects": [],
+        "get_symmetry_score": [],
+        "alle_pruefungen_getrennt": [],
+        "alle_pruefungen_gemeinsam": [],
+    }
+
+    for image in images:
+        for _ in range(repeat):
+            res = []
+            t, has_result = timed(segmentierung.run_preprocessing, image, res)
+            stages["run_preprocessing"].append(t)
+        if not has_result:
+            continue
+        warped = res[-1]["data"]
+
+        for _ in range(repeat):
+            stages["analyze_snack_geometry"].append(timed(bruch.analyze_snack_geometry, warped)[0])
+            stages["calculate_edge_sum"].append(timed(rest.calculate_edge_sum, warped)[0])
+            stages["detect_defects"].append(timed(farb.detect_defects, warped, farb.SPOT_THRESHOLD)[0])
+            stages["get_symmetry_score"].append(timed(symmetrie.get_symmetry_score, warped, symmetry_engine)[0])
+            stages["alle_pruefungen_getrennt"].append(timed(run_all_checks, warped, symmetry_engine, False)[0])
+            stages["alle_pruefungen_gemeinsam"].append(timed(run_all_checks, warped, symmetry_engine, True)[0])
+
+    return {name: summarize(samples) for name, samples in stages.items()}
+
+
+def bench_end_to_end(data_dir, workers, symmetry_engine=None):
+    raw_dir = os.path.join(data_dir, "Images")
+    results = {}
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        t, count = timed(
+            pipeline.run_pipeline, raw_dir, os.path.join(out_dir, "sorted"),
+            workers=workers, symmetry_engine=symmetry_engine,
+        )
+        results["in_memory"] = {"seconds": round(t, 3), "images": count, "images_per_sec": round(count / t, 2) if t else 0}
+
+        processed = os.path.join(out_dir, "processed")
+        sorted_dir = os.path.join(out_dir, "staged")
+        start = time.perf_counter()
+        segmentierung.prepare_dataset(raw_dir, processed, workers=workers)
+        bruch.sort_images(processed, sorted_dir, workers=workers)
+        rest.run_complexity_check(sorted_dir, workers=workers)
+        farb.run_color_check(sorted_dir, workers=workers)
+        symmetrie.run_symmetry_check(sorted_dir, workers=workers, engine=symmetry_engine)
+        t = time.perf_counter() - start
+        results["staged"] = {"seconds": round(t, 3), "images": count, "images_per_sec": round(count / t, 2) if t else 0}
+
+    return results
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(args):
+    counts = {"normal": args.normal, "breakage": args.breakage, "spot": args.spot, "fragment": args.fragment}
+    data_dir = tempfile.mkdtemp(prefix="synthetik_")
+
+    try:
+        synthetik.write_dataset(data_dir, counts, args.height, args.seed)
+
+        images = []
+        for folder in ["Normal", "Anomaly"]:
+            folder_path = os.path.join(data_dir, "Images", folder)
+            for file_name in sorted(os.listdir(folder_path)):
+                images.append(cv2.imread(os.path.join(folder_path, file_name)))
+
+        print(f"[laufzeit.py] Messe Einzelstufen auf {len(images)} Bildern ({args.repeat}x)...")
+        stages = bench_stages(images, args.repeat, args.symmetry_engine)
+
+        report = {
+            "environment": environment(),
+            "parameters": {**counts, "height": args.height, "seed": args.seed, "repeat": args.repeat,
+                           "workers": args.workers, "symmetry_engine": args.symmetry_engine},
+            "stages": stages,
+        }
+
+        if not args.skip_end_to_end:
+            print("[laufzeit.py] Messe Gesamtdurchlauf...")
+            report["end_to_end"] = bench_end_to_end(data_dir, args.workers, args.symmetry_engine)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print("\n" + "=" * 65)
+    print("   LAUFZEIT PRO STUFE (ms pro Bild)")
+    print("=" * 65)
+    for name, s in stages.items():
+        if s["n"]:
+            print(f"{name:<26} | Mittel {s['mean_ms']:8.2f} | Median {s['median_ms']:8.2f} | p95 {s['p95_ms']:8.2f}")
+    for name, s in report.get("end_to_end", {}).items():
+        print(f"{'Gesamt ' + name:<26} | {s['seconds']:8.2f} s | {s['images_per_sec']:8.2f} Bilder/s")
+    print("=" * 65)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"[laufzeit.py] Ergebnisse in {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Laufzeit-Benchmark der Pipeline auf synthetischen Snack-Bildern.")
+    parser.add_argument("--normal", type=int, default=8)
+    parser.add_argument("--breakage", type=int, default=3)
+    parser.add_argument("--spot", type=int, default=3)
+    parser.add_argument("--fragment", type=int, default=2)
+    parser.add_argument("--height", type=int, default=1200, help="Höhe der Rohbilder in Pixeln")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Stufe und Bild")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--symmetry-engine", choices=sorted(symmetrie.SYMMETRY_ENGINES), default=symmetrie.SYMMETRY_ENGINE)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--output", default="benchmark.json")
+    run(parser.parse_args())
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetik
+from scripts import pipeline
+from scripts import segmentierung
+
+
+def raw_images(folder, count, height, seed):
+    if not folder:
+        return [synthetik.snack_for_kind(synthetik.KINDS[i % len(synthetik.KINDS)], height, seed + i) for i in range(count)]
+
+    images = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                image = cv2.imread(os.path.join(root, file_name))
+                if image is not None:
+                    images.append(image)
+    return images[:count] if count else images
+
+
+def segment_all(engine, images):
+    start = time.perf_counter()
+    results = []
+    for image in images:
+        res = []
+        segmentierung.run_preprocessing(image, res, engine)
+        results.append([item["data"] for item in res])
+    return time.perf_counter() - start, results
+
+
+def reencoded(image):
+    return cv2.imdecode(cv2.imencode(".jpg", image)[1], cv2.IMREAD_COLOR)
+
+
+def run(images, repeat):
+    height, width = images[0].shape[:2]
+    print(f"[segmentierung_vergleich.py] {len(images)} Rohbilder ({width}x{height})")
+
+    timings = {}
+    outputs = {}
+    for engine in ["classic", "fast"]:
+        timings[engine] = min(segment_all(engine, images)[0] for _ in range(repeat))
+        outputs[engine] = segment_all(engine, images)[1]
+        print(f"   {engine:<8} {timings[engine] * 1000:9.1f} ms | {timings[engine] / len(images) * 1000:7.2f} ms/Bild")
+
+    count_mismatches = 0
+    class_mismatches = 0
+    compared = 0
+    diffs = []
+    for classic, fast in zip(outputs["classic"], outputs["fast"]):
+        count_mismatches += len(classic) != len(fast)
+        if not classic or not fast:
+            class_mismatches += bool(classic) != bool(fast)
+            continue
+        pairs = zip(classic, fast) if len(classic) == len(fast) else [(classic[0], fast[0])]
+        for obj_classic, obj_fast in pairs:
+            diffs.append(np.abs(obj_classic.astype(np.int16) - obj_fast.astype(np.int16)).mean())
+            a = pipeline.classify_image(reencoded(obj_classic))["category"]
+            b = pipeline.classify_image(reencoded(obj_fast))["category"]
+            class_mismatches += a != b
+            compared += 1
+
+    print(f"   Faktor {timings['classic'] / timings['fast']:5.2f}")
+    print(f"   Mittlere Pixelabweichung: {np.mean(diffs) if diffs else 0:.2f} Grauwerte")
+    # Beide zählen nur äußere Konturen; 'fast' sucht sie aber in der verkleinerten Kopie.
+    print(f"   Abweichende Objektanzahl: {count_mismatches} (Objekte nahe {segmentierung.MIN_OBJECT_AREA} Pixel "
+          f"oder in der verkleinerten Kopie verschmolzen)")
+    print(f"   Abweichende Klassen: {class_mismatches} von {compared} Objekten (bei abweichender Anzahl nur das erste)")
+    return class_mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vergleich der Segmentierung 'classic' und 'fast' (Laufzeit, Pixel, Klassen).")
+    parser.add_argument("ordner", nargs="?", help="Ordner mit Rohbildern, z.B. data/Images (sonst synthetisch)")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--height", type=int, default=1600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = raw_images(args.ordner, args.count if not args.ordner else 0, args.height, args.seed)
+    sys.exit(1 if run(images, args.repeat) else 0)
@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import dateien
+from scripts import ergebnis
+from scripts import manifest
+from scripts import puffer
+from scripts import symmetrie
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 ** 2
+
+
+def create_files(base_dir, count):
+    for folder in ("Normal", "Anomaly"):
+        os.makedirs(os.path.join(base_dir, folder), exist_ok=True)
+    for i in range(count):
+        folder = "Normal" if i % 2 else "Anomaly"
+        open(os.path.join(base_dir, folder, f"{i:08d}.jpg"), 'wb').close()
+
+
+def listed_jobs(base_dir):
+    jobs = []
+    for root, dirs, files in os.walk(base_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                jobs.append((os.path.join(root, file_name), file_name))
+    return sum(1 for _ in zip(jobs, puffer.prefetch(len, (path for path, _ in jobs))))
+
+
+def streamed_jobs(base_dir):
+    jobs = ((os.path.join(root, file_name), file_name) for root, file_name in dateien.scan_images(base_dir))
+    jobs, pending = itertools.tee(jobs)
+    return sum(1 for _ in zip(jobs, puffer.prefetch(len, (path for path, _ in pending))))
+
+
+def move_while_scanning(base_dir, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    seen = 0
+    for root, file_name in dateien.scan_images(base_dir):
+        os.rename(os.path.join(root, file_name), os.path.join(target_dir, file_name))
+        seen += 1
+    return seen
+
+
+def rename_while_scanning(base_dir):
+    seen = 0
+    for root, file_name in dateien.scan_images(base_dir, skip=symmetrie.is_scored):
+        os.rename(os.path.join(root, file_name), os.path.join(root, symmetrie.scored_filename(50.0, file_name)))
+        seen += 1
+    return seen
+
+
+def create_results(base_dir, count):
+    sorted_dir = os.path.join(base_dir, "sorted")
+    os.makedirs(sorted_dir, exist_ok=True)
+    manifest_path = manifest.path_for(sorted_dir)
+    manifest.reset(manifest_path)
+    classes = ["Normal", "Bruch", "Farbfehler", "Rest"]
+    with manifest.writer(manifest_path, batch=10000) as record:
+        for i in range(count):
+            record({"datei": f"Anomaly_{i:08d}.JPG", "bild": f"Anomaly_{i:08d}.JPG", "klasse": classes[i % 4]})
+
+    csv_path = os.path.join(base_dir, "image_anno.csv")
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["image", "label", "mask"])
+        for i in range(count):
+            writer.writerow([f"data/Images/Anomaly/{i:08d}.JPG", ["normal", "breakage", "spot", "fragment"][i % 3], ""])
+    return sorted_dir, csv_path
+
+
+def loaded_evaluation(sorted_dir, csv_path):
+    ground_truth, basename_index = ergebnis.load_ground_truth(csv_path)
+    rows = manifest.read(manifest.path_for(sorted_dir))
+    return len(ground_truth) + len(basename_index) + len(rows)
+
+
+def streamed_evaluation(sorted_dir, csv_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ergebnis.evaluate_results(sorted_dir, csv_path)["misses"]
+
+
+def run(files, rows):
+    base_dir = tempfile.mkdtemp(prefix="speicherbedarf_")
+    failures = 0
+    try:
+        images_dir = os.path.join(base_dir, "Images")
+        create_files(images_dir, files)
+        print(f"[speicherbedarf.py] {files} Bilddateien, {rows} Manifest- und CSV-Zeilen")
+
+        for label, func in (("Liste (os.walk)", listed_jobs), ("Strom (scandir)", streamed_jobs)):
+            count, elapsed, peak = measure(func, images_dir)
+            print(f"   Aufzählung {label:<16} {elapsed:6.2f} s | Python-Heap-Spitze {peak:7.2f} MB | {count} Bilder")
+
+        moved = move_while_scanning(images_dir, os.path.join(base_dir, "verschoben"))
+        shutil.move(os.path.join(base_dir, "verschoben"), os.path.join(images_dir, "Normal", "verschoben"))
+        renamed = rename_while_scanning(images_dir)
+        print(f"   Verschieben beim Aufzählen: {moved}/{files} | Umbenennen im selben Ordner: {renamed}/{files}")
+        failures += (moved != files) + (renamed != files)
+
+        sorted_dir, csv_path = create_results(base_dir, rows)
+        for label, func in (("geladen (dict)", loaded_evaluation), ("SQLite-Join", streamed_evaluation)):
+            _, elapsed, peak = measure(func, sorted_dir, csv_path)
+            print(f"   Evaluierung {label:<15} {elapsed:6.2f} s | Python-Heap-Spitze {peak:7.2f} MB")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Speicherbedarf von Aufzählung und Evaluierung in Abhängigkeit der Datenmenge.")
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.files, args.rows) else 0)
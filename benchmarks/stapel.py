@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetik
+from scripts import kaskade
+from scripts import merkmale
+from scripts import segmentierung
+from scripts import stapel
+
+BATCH_FEATURES = [name for name in kaskade.required_features() if name in stapel.BATCHED]
+
+
+def warped_images(count, height, seed):
+    images = []
+    for i in range(count):
+        kind = synthetik.KINDS[i % len(synthetik.KINDS)]
+        res = []
+        if segmentierung.run_preprocessing(synthetik.snack_for_kind(kind, height, seed + i), res):
+            images.append(res[-1]["data"])
+    return images
+
+
+def single_features(images):
+    return [merkmale.prepare(merkmale.for_image(img), BATCH_FEATURES) for img in images]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run(count, batch_sizes, repeat, height, seed):
+    images = warped_images(count, height, seed)
+    print(f"[stapel.py] {len(images)} entzerrte Bilder ({images[0].shape[1]}x{images[0].shape[0]})")
+
+    mismatches = 0
+    t_single = min(timed(single_features, images)[0] for _ in range(repeat))
+    reference = single_features(images)
+    print(f"   Einzeln        {t_single * 1000:8.2f} ms | {t_single / len(images) * 1000:6.3f} ms/Bild")
+
+    for size in batch_sizes:
+        def batched():
+            return [f for i in range(0, len(images), size) for f in stapel.batch_features(images[i: i + size], BATCH_FEATURES)]
+
+        t_batch = min(timed(batched)[0] for _ in range(repeat))
+        for ref, got in zip(reference, batched()):
+            mismatches += sum(not np.array_equal(ref[name], got[name]) for name in BATCH_FEATURES)
+        print(f"   Stapel {size:<7} {t_batch * 1000:8.2f} ms | {t_batch / len(images) * 1000:6.3f} ms/Bild "
+              f"| Faktor {t_single / t_batch:5.2f}")
+
+    print(f"   Abweichende Merkmale: {mismatches}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vergleich Einzelbild- vs. Stapel-Merkmale (stapel.py).")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.count, args.batch_sizes, args.repeat, args.height, args.seed) else 0)
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import symmetrie
+
+
+def run(image_dir, show_all=False):
+    names = []
+    scores = {engine: [] for engine in symmetrie.SYMMETRY_ENGINES}
+    times = {engine: 0.0 for engine in symmetrie.SYMMETRY_ENGINES}
+
+    for root, dirs, files in os.walk(image_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                continue
+            image = cv2.imread(os.path.join(root, file_name))
+            if image is None:
+                continue
+
+            names.append(os.path.relpath(os.path.join(root, file_name), image_dir))
+            for engine in symmetrie.SYMMETRY_ENGINES:
+                start = time.perf_counter()
+                scores[engine].append(symmetrie.get_symmetry_score(image, engine))
+                times[engine] += time.perf_counter() - start
+
+    if not names:
+        print(f"[symmetrie_vergleich.py] Keine Bilder in {image_dir} gefunden.")
+        return
+
+    affine = np.array(scores["affine"])
+    polar = np.array(scores["polar"])
+    diff = polar - affine
+
+    if show_all:
+        print(f"{'Bild':<40} | {'affine':>8} | {'polar':>8} | {'Diff':>7}")
+        for name, a, p in zip(names, affine, polar):
+            print(f"{name:<40} | {a:8.2f} | {p:8.2f} | {p - a:+7.2f}")
+
+    corr = np.corrcoef(affine, polar)[0, 1] if len(names) > 1 and affine.std() > 0 and polar.std() > 0 else float("nan")
+    rank_corr = np.corrcoef(affine.argsort().argsort(), polar.argsort().argsort())[0, 1] if len(names) > 1 else float("nan")
+
+    print("\n" + "=" * 65)
+    print(f"   SYMMETRIE-VERFAHREN IM VERGLEICH ({len(names)} Bilder)")
+    print("=" * 65)
+    for engine in symmetrie.SYMMETRY_ENGINES:
+        s = np.array(scores[engine])
+        print(f"{engine:<8} | Mittel {s.mean():6.2f} | Min {s.min():6.2f} | Max {s.max():6.2f} "
+              f"| {times[engine] / len(names) * 1000:6.2f} ms/Bild")
+    print("-" * 65)
+    print(f"Mittlere abs. Abweichung: {np.abs(diff).mean():.2f} Punkte (max. {np.abs(diff).max():.2f})")
+    print(f"Korrelation: {corr:.3f} | Rangkorrelation: {rank_corr:.3f}")
+    print(f"Beschleunigung polar: {times['affine'] / times['polar']:.1f}x")
+    print("=" * 65)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vergleicht Symmetrie-Score 'affine' und 'polar' auf einem Bildordner.")
+    parser.add_argument("image_dir", help="z.B. output/sorted/Normal oder output/processed")
+    parser.add_argument("--all", action="store_true", help="Score jedes einzelnen Bildes ausgeben")
+    args = parser.parse_args()
+    run(args.image_dir, args.all)
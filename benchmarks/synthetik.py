@@ -0,0 +1,145 @@
+import argparse
+import csv
+import math
+import os
+
+import cv2
+import numpy as np
+
+BACKGROUND_BGR = (40, 160, 60)
+SNACK_BGR = (90, 170, 215)
+SPOT_BGR = (20, 30, 45)
+KINDS = ["normal", "breakage", "spot", "fragment"]
+
+
+def render_snack(height=1200, breakage=0.0, spots=0, fragment=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    width = int(height * 1.3)
+
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = BACKGROUND_BGR
+    noise = rng.integers(-10, 10, image.shape)
+    image = np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    cx = width / 2 + rng.uniform(-0.025, 0.025) * height
+    cy = height / 2 + rng.uniform(-0.025, 0.025) * height
+    radius = height * 0.3
+    rotation = rng.uniform(0, math.pi / 3)
+
+    def polar(r, angle):
+        return [cx + r * math.cos(angle), cy + r * math.sin(angle)]
+
+    shape = np.zeros((height, width), np.uint8)
+    hexagon = np.array([polar(radius, rotation + k * math.pi / 3) for k in range(6)], np.int32)
+    cv2.fillPoly(shape, [hexagon], 255)
+
+    hub, outer, gap = radius * 0.22, radius * 0.80, 0.25
+    for k in range(6):
+        a0 = rotation + k * math.pi / 3 + gap
+        a1 = rotation + (k + 1) * math.pi / 3 - gap
+        window = np.array([polar(hub / math.cos(gap), (a0 + a1) / 2), polar(outer, a0), polar(outer, a1)], np.int32)
+        cv2.fillPoly(shape, [window], 0)
+
+    if breakage > 0:
+        bite = np.array(polar(radius, rotation + 0.4), np.int32)
+        cv2.circle(shape, tuple(int(v) for v in bite), int(radius * breakage), 0, -1)
+
+    if fragment > 0:
+        cut = int(cx - radius + 2 * radius * fragment)
+        shape[:, :cut] = 0
+
+    image[shape > 0] = SNACK_BGR
+
+    spot_mask = np.zeros_like(shape)
+    for i in range(spots):
+        center = np.array(polar(radius * 0.5, rotation + i * math.pi / 3), np.int32)
+        cv2.circle(spot_mask, tuple(int(v) for v in center), max(1, int(height * 0.02)), 255, -1)
+    image[(spot_mask > 0) & (shape > 0)] = SPOT_BGR
+
+    return image
+
+
+def snack_for_kind(kind, height, seed):
+    if kind == "breakage":
+        return render_snack(height, breakage=0.35, seed=seed)
+    if kind == "spot":
+        return render_snack(height, spots=1, seed=seed)
+    if kind == "fragment":
+        return render_snack(height, fragment=0.5, seed=seed)
+    return render_snack(height, seed=seed)
+
+
+def tray(kinds, height, seed):
+    return np.hstack([snack_for_kind(kind, height, seed + i) for i, kind in enumerate(kinds)])
+
+
+def write_video(path, kinds, height=500, fps=25, speed=40, seed=0):
+    snacks = [snack_for_kind(kind, height, seed + i) for i, kind in enumerate(kinds)]
+    width = snacks[0].shape[1]
+    belt = np.hstack([np.full_like(snacks[0], BACKGROUND_BGR)] + snacks + [np.full_like(snacks[0], BACKGROUND_BGR)])
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width * 2, height))
+    if not writer.isOpened():
+        raise OSError(f"Video {path} kann nicht geschrieben werden (MJPG-Encoder oder Dateiendung prüfen)")
+    frames = 0
+    for offset in range(belt.shape[1] - width * 2, -1, -speed):
+        writer.write(belt[:, offset: offset + width * 2])
+        frames += 1
+    writer.release()
+
+    print(f"[synthetik.py] {frames} Bilder mit {len(kinds)} Snacks nach {path} geschrieben.")
+    return frames
+
+
+def write_dataset(base_dir, counts, height=1200, seed=0, per_frame=1):
+    os.makedirs(os.path.join(base_dir, "Images", "Normal"), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "Images", "Anomaly"), exist_ok=True)
+
+    kinds = [kind for kind in KINDS for _ in range(counts.get(kind, 0))]
+    rows = []
+    index = 0
+    for start in range(0, len(kinds), per_frame):
+        frame_kinds = kinds[start: start + per_frame]
+        folder = "Normal" if set(frame_kinds) == {"normal"} else "Anomaly"
+        name = f"{index:05d}.JPG"
+        cv2.imwrite(os.path.join(base_dir, "Images", folder, name), tray(frame_kinds, height, seed + start))
+        rows.append((f"synthetik/Data/Images/{folder}/{name}", ",".join(frame_kinds)))
+        index += 1
+
+    with open(os.path.join(base_dir, "image_anno.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["image", "label", "mask"])
+        for image_path, label in rows:
+            writer.writerow([image_path, label, ""])
+
+    print(f"[synthetik.py] {index} Bilder nach {base_dir} geschrieben.")
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Erzeugt einen synthetischen Datensatz im Format von data/.")
+    parser.add_argument("target", help="Zielordner, z.B. data_synth")
+    parser.add_argument("--normal", type=int, default=8)
+    parser.add_argument("--breakage", type=int, default=3)
+    parser.add_argument("--spot", type=int, default=3)
+    parser.add_argument("--fragment", type=int, default=2)
+    parser.add_argument("--height", type=int, default=1200, help="Bildhöhe in Pixeln (Breite = 1.3 x Höhe)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-frame", type=int, default=1, help="Snacks pro Bild nebeneinander (Tablett)")
+    parser.add_argument("--video", action="store_true", help="Statt Einzelbildern ein Förderband-Video (MJPG) nach TARGET schreiben")
+    parser.add_argument("--speed", type=int, default=40, help="Mit --video: Vorschub in Pixeln pro Bild")
+    args = parser.parse_args()
+
+    if args.video:
+        counts = {"normal": args.normal, "breakage": args.breakage, "spot": args.spot, "fragment": args.fragment}
+        write_video(args.target, [kind for kind in KINDS for _ in range(counts[kind])], args.height, speed=args.speed, seed=args.seed)
+        raise SystemExit(0)
+
+    write_dataset(
+        args.target,
+        {"normal": args.normal, "breakage": args.breakage, "spot": args.spot, "fragment": args.fragment},
+        args.height,
+        args.seed,
+        args.per_frame,
+    )
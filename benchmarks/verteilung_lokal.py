@@ -0,0 +1,78 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import manifest
+from scripts import verteilung
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+SORTED_DIR = os.path.join("output", "sorted")
+COMPARED_FIELDS = ["klasse", "grund", "symmetrie"]
+
+
+def run_main(extra, log_path):
+    with open(log_path, 'w', encoding='utf-8') as log:
+        return subprocess.Popen([sys.executable, MAIN, *extra], stdout=log, stderr=subprocess.STDOUT)
+
+
+def snapshot():
+    rows = manifest.read(manifest.path_for(SORTED_DIR))
+    files = sorted(
+        os.path.relpath(os.path.join(root, f), SORTED_DIR)
+        for root, _, names in os.walk(SORTED_DIR)
+        for f in names
+    )
+    return {row["datei"]: tuple(row[c] for c in COMPARED_FIELDS) for row in rows}, files
+
+
+def run(shards, extra, log_dir):
+    os.makedirs(log_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if run_main(extra, os.path.join(log_dir, "gesamt.log")).wait():
+        print("[verteilung_lokal.py] Fehler im Lauf ohne Shards, siehe gesamt.log")
+        return 1
+    t_single = time.perf_counter() - start
+    reference, reference_files = snapshot()
+
+    shutil.rmtree(os.path.join("output", verteilung.SHARDS_DIR), ignore_errors=True)
+    start = time.perf_counter()
+    processes = [
+        run_main([*extra, "--shard", f"{i}/{shards}"], os.path.join(log_dir, f"shard_{i}.log"))
+        for i in range(shards)
+    ]
+    failed = [i for i, process in enumerate(processes) if process.wait()]
+    if failed:
+        print(f"[verteilung_lokal.py] Fehler in Shards {failed}, siehe {log_dir}")
+        return 1
+    t_shards = time.perf_counter() - start
+
+    if run_main([*extra, "--merge-shards"], os.path.join(log_dir, "zusammenfuehren.log")).wait():
+        print("[verteilung_lokal.py] Fehler beim Zusammenführen, siehe zusammenfuehren.log")
+        return 1
+    merged, merged_files = snapshot()
+
+    differences = sorted(name for name in set(reference) | set(merged) if reference.get(name) != merged.get(name))
+    for name in differences[:10]:
+        print(f"   {name}: ohne Shards {reference.get(name)}, zusammengeführt {merged.get(name)}")
+
+    print(f"[verteilung_lokal.py] {len(reference)} Objekte | ohne Shards {t_single:.1f} s | "
+          f"{shards} Shards parallel {t_shards:.1f} s")
+    print(f"   Abweichende Urteile: {len(differences)}, gleiche Ordnerstruktur: {reference_files == merged_files}")
+    return 1 if differences or reference_files != merged_files else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Führt main.py einmal ohne und einmal in K Shards als getrennte Prozesse aus und vergleicht das Ergebnis. "
+                    "Unbekannte Optionen (z.B. --in-memory) gehen an main.py."
+    )
+    parser.add_argument("--shards", type=int, default=3)
+    parser.add_argument("--logs", default=os.path.join("output", "shard_logs"))
+    args, extra = parser.parse_known_args()
+    sys.exit(run(args.shards, extra, args.logs))
@@ -1,5 +1,7 @@
+import argparse
 import os
 import sys
+import time
 
 from scripts import segmentierung
 from scripts import bruch
@@ -7,9 +9,19 @@ from scripts import rest
 from scripts import farb
 from scripts import symmetrie
 from scripts import ergebnis
+from scripts import pipeline
+from scripts import cache
+from scripts import kalibrierung
+from scripts import manifest
+from scripts import ueberwachung
+from scripts import video
+from scripts import dienst
+from scripts import verteilung
+from scripts import metriken
+from scripts import puffer
 
 
-def resolve_all_paths():
+def resolve_all_paths(base_dir=None, shard=None):
     def valid(base):
         imgs = os.path.join(base, "Images")
         return all(
@@ -21,14 +33,19 @@ def resolve_all_paths():
             ]
         )
 
-    base_dir = "data"
-    if not valid(base_dir):
+    if base_dir is not None:
+        if not valid(base_dir):
+            print(f"Fehler: {base_dir} enthält nicht Images/Normal, Images/Anomaly und image_anno.csv.")
+            sys.exit(1)
+    elif not valid("data"):
         base_dir = input("Pfad zu 'data' mit Images/Normal, Images/Anomaly und image_anno.csv: ").strip()
         if not base_dir or not valid(base_dir):
             print("Fehler: Gültige Datenstruktur nicht gefunden. Programm wird beendet.")
             sys.exit(1)
+    else:
+        base_dir = "data"
 
-    output_dir = "output"
+    output_dir = verteilung.shard_dir("output", shard) if shard else "output"
     return {
         "base": base_dir,
         "raw": os.path.join(base_dir, "Images"),
@@ -36,21 +53,346 @@ def resolve_all_paths():
         "output": output_dir,
         "processed": os.path.join(output_dir, "processed"),
         "sorted": os.path.join(output_dir, "sorted"),
+        "cache": os.path.join(output_dir, "cache"),
+        "store": os.path.join(output_dir, "speicher"),
+        "calibration": os.path.join(output_dir, "kalibrierung"),
     }
 
 
+def shard_arg(text):
+    try:
+        return verteilung.parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Snack-Inspektion: Segmentierung, Klassifikation und Evaluierung.")
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Jedes Bild nur einmal dekodieren und alle Prüfungen im Speicher ausführen (kein output/processed).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Anzahl paralleler Prozesse für die Bildverarbeitung (Standard: 1).",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=puffer.READ_THREADS,
+        metavar="N",
+        help="Threads zum Vorauslesen und Dekodieren bzw. Schreiben im Hintergrund (0 = aus).",
+    )
+    parser.add_argument(
+        "--symmetry-engine",
+        choices=sorted(symmetrie.SYMMETRY_ENGINES),
+        default=symmetrie.SYMMETRY_ENGINE,
+        help="Verfahren für den Symmetrie-Score: 'affine' (5 Rotationen) oder 'polar' (eine Polar-Transformation).",
+    )
+    parser.add_argument(
+        "--segmentation",
+        choices=sorted(segmentierung.SEGMENTATION_ENGINES),
+        default=segmentierung.SEGMENTATION_ENGINE,
+        help="Segmentierung: 'classic' (volle Auflösung, Entzerren und Skalieren) oder 'fast' (Kontursuche verkleinert, eine Transformation direkt auf 400x400; Objekte nahe einer Schwelle können die Klasse wechseln).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Ergebnisse pro Bildinhalt und Schwellwert-Satz in output/cache wiederverwenden (inkrementelle Läufe).",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Cache vor dem Lauf vollständig leeren.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=cache.MAX_CACHE_BYTES // 1024 ** 2,
+        help="Maximale Cache-Größe in MB; älteste Einträge werden danach verdrängt.",
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="ORDNER",
+        help="Dauerbetrieb: neue Bilder in ORDNER laufend prüfen und Urteile an output/watch_results.csv anhängen.",
+    )
+    parser.add_argument(
+        "--watch-polling",
+        action="store_true",
+        help="Im Dauerbetrieb Polling statt inotify verwenden.",
+    )
+    parser.add_argument(
+        "--watch-idle-exit",
+        type=float,
+        default=0,
+        metavar="SEKUNDEN",
+        help="Dauerbetrieb beenden, wenn so lange kein neues Bild eingetroffen ist (0 = nie).",
+    )
+    parser.add_argument(
+        "--data",
+        metavar="ORDNER",
+        help="Datenordner mit Images/Normal, Images/Anomaly und image_anno.csv (Standard: data, sonst Abfrage).",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_arg,
+        metavar="I/K",
+        help="Nur Shard I von K bearbeiten (Zuordnung per Hash des Bildnamens) und das Teilergebnis nach output/shards/ schreiben.",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        action="store_true",
+        help="Fertige Teilergebnisse aus output/shards/ nach output/sorted zusammenführen und gemeinsam evaluieren.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Lokalen HTTP-Prüfdienst starten: POST /pruefen mit Bilddaten liefert das Urteil als JSON, ohne Dateien zu schreiben.",
+    )
+    parser.add_argument("--serve-host", default=dienst.HOST, metavar="HOST", help="Adresse des Prüfdienstes.")
+    parser.add_argument("--serve-port", type=int, default=dienst.PORT, metavar="PORT", help="Port des Prüfdienstes.")
+    parser.add_argument(
+        "--serve-batch",
+        type=int,
+        default=dienst.BATCH_SIZE,
+        metavar="N",
+        help="Höchstens N gleichzeitige Anfragen zu einem Stapel zusammenfassen.",
+    )
+    parser.add_argument(
+        "--serve-wait-ms",
+        type=float,
+        default=dienst.BATCH_WAIT_MS,
+        metavar="MS",
+        help="So lange nach der ersten Anfrage auf weitere für denselben Stapel warten.",
+    )
+    parser.add_argument(
+        "--video",
+        metavar="QUELLE",
+        help="Videodatei oder Bildfolge (z.B. band/%%04d.png) lesen, Snacks über die Bilder verfolgen und jeden einmal prüfen.",
+    )
+    parser.add_argument(
+        "--video-budget-ms",
+        type=float,
+        default=video.LATENCY_BUDGET_MS,
+        metavar="MS",
+        help="Zeitbudget pro Videobild (Standard: 1000/Bildrate, 0 = unbegrenzt). Bei Überschreitung werden Bilder verworfen oder Snacks nur reduziert geprüft.",
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help="Segmentierte Bilder statt als Einzeldateien in output/processed in einer Rohdatei unter output/speicher ablegen und per Memory-Mapping prüfen.",
+    )
+    parser.add_argument(
+        "--no-export",
+        action="store_true",
+        help="Mit --store: keine Bilder nach output/sorted exportieren, nur output/speicher/ergebnisse.csv und output/manifest.sqlite schreiben.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Nur mit --in-memory: N entzerrte Bilder stapeln und Graustufen, Schwellwerte und Brandmaske gemeinsam berechnen. Andere Modi lehnen N > 1 ab.",
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Schwellwerte kalibrieren: Merkmale einmal pro Bild extrahieren (output/kalibrierung/merkmale.csv) und Schwellwert-Kombinationen gegen image_anno.csv durchsuchen.",
+    )
+    parser.add_argument(
+        "--calibrate-samples",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Zufallssuche mit N Kandidaten statt Rastersuche.",
+    )
+    parser.add_argument(
+        "--calibrate-target",
+        choices=["gesamt", "klassen"],
+        default="gesamt",
+        help="Optimierungsziel: Gesamtgenauigkeit oder mittlere Genauigkeit pro Klasse.",
+    )
+    parser.add_argument(
+        "--calibrate-refresh",
+        action="store_true",
+        help="Merkmale neu extrahieren, auch wenn output/kalibrierung/merkmale.csv existiert.",
+    )
+    parser.add_argument(
+        "--error-links",
+        action="store_true",
+        help="Falsch zugeordnete Bilder zusätzlich als symbolische Verknüpfungen in output/sorted/Falsch ablegen.",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="DATEI",
+        help="Laufzeit pro Stufe und Phase, Entscheidungszweige und Speicherbedarf messen und als JSON (oder CSV bei .csv) schreiben.",
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        metavar="DATEI",
+        help="Metriken zusätzlich im Prometheus-Textformat schreiben.",
+    )
+    args = parser.parse_args()
+    if args.batch_size > 1 and (
+        not args.in_memory or args.watch or args.video or args.serve or args.calibrate or args.merge_shards
+    ):
+        parser.error("--batch-size wirkt nur im In-Memory-Lauf (--in-memory ohne --watch, --video, --serve, "
+                     "--calibrate oder --merge-shards); der Dienst stapelt über --serve-batch")
+    return args
+
+
+def run_watch(args):
+    output_dir = "output"
+    ueberwachung.watch_folder(
+        args.watch,
+        os.path.join(output_dir, "sorted"),
+        os.path.join(output_dir, "watch_results.csv"),
+        workers=args.workers,
+        symmetry_engine=args.symmetry_engine,
+        use_inotify=False if args.watch_polling else None,
+        idle_exit=args.watch_idle_exit,
+        segmentation_engine=args.segmentation,
+    )
+
+
+def run_video(args):
+    stats = video.run_video(
+        args.video,
+        os.path.join("output", "sorted"),
+        budget_ms=args.video_budget_ms,
+        symmetry_engine=args.symmetry_engine,
+    )
+    return stats is not None
+
+
+def run_server(args):
+    dienst.run_server(
+        args.serve_host,
+        args.serve_port,
+        workers=args.workers,
+        symmetry_engine=args.symmetry_engine,
+        batch_size=args.serve_batch,
+        batch_wait_ms=args.serve_wait_ms,
+        segmentation_engine=args.segmentation,
+    )
+
+
+def report_metrics(args):
+    if not metriken.ENABLED:
+        return
+    data = metriken.export(args.metrics, args.metrics_prometheus)
+    metriken.print_summary(data)
+
+
 if __name__ == '__main__':
-    p = resolve_all_paths()
+    args = parse_args()
+    metriken.enable(bool(args.metrics or args.metrics_prometheus))
+    puffer.configure(args.io_threads)
+
+    if args.watch:
+        if not os.path.isdir(args.watch):
+            print(f"Fehler: Ordner {args.watch} existiert nicht.")
+            sys.exit(1)
+        run_watch(args)
+        report_metrics(args)
+        sys.exit(0)
 
-    segmentierung.prepare_dataset(p["raw"], p["processed"])
-    if not os.listdir(p["processed"]):
-        print("Fehler: Keine Bilder verarbeitet.")
+    if args.serve:
+        run_server(args)
+        report_metrics(args)
+        sys.exit(0)
+
+    if args.video:
+        ok = run_video(args)
+        report_metrics(args)
+        sys.exit(0 if ok else 1)
+
+    if args.shard and (args.calibrate or args.merge_shards):
+        print("Fehler: --shard ist nicht mit --calibrate oder --merge-shards kombinierbar.")
         sys.exit(1)
+    verteilung.SHARD = args.shard
+    started = time.perf_counter()
+
+    p = resolve_all_paths(args.data, args.shard)
+
+    if args.merge_shards:
+        merged = verteilung.merge_shards(
+            os.path.join(p["output"], verteilung.SHARDS_DIR), p["sorted"], manifest.path_for(p["sorted"])
+        )
+        if merged is None:
+            sys.exit(1)
+        ergebnis.evaluate_results(p["sorted"], p["anno"], error_links=args.error_links)
+        report_metrics(args)
+        sys.exit(0)
+
+    if args.shard:
+        verteilung.clear_shard_info(p["output"])
+
+    if args.clear_cache:
+        cache.clear(p["cache"])
+    cache_dir = p["cache"] if args.cache else None
+
+    if args.calibrate:
+        kalibrierung.calibrate(
+            p["raw"], p["anno"], p["calibration"], workers=args.workers, cache_dir=cache_dir,
+            samples=args.calibrate_samples, target=args.calibrate_target, refresh=args.calibrate_refresh,
+            segmentation_engine=args.segmentation,
+        )
+        report_metrics(args)
+        sys.exit(0)
+
+    if args.in_memory:
+        with metriken.timer("pipeline", "gesamt"):
+            processed = pipeline.run_pipeline(
+                p["raw"], p["sorted"], workers=args.workers, symmetry_engine=args.symmetry_engine,
+                cache_dir=cache_dir, batch_size=args.batch_size, segmentation_engine=args.segmentation,
+            )
+        if not processed and not args.shard:
+            print("Fehler: Keine Bilder verarbeitet.")
+            sys.exit(1)
+    elif args.store:
+        with metriken.timer("segmentierung", "gesamt"):
+            stored = segmentierung.prepare_store(
+                p["raw"], p["store"], workers=args.workers, cache_dir=cache_dir, segmentation_engine=args.segmentation,
+            )
+        if not stored and not args.shard:
+            print("Fehler: Keine Bilder verarbeitet.")
+            sys.exit(1)
+
+        with metriken.timer("pipeline", "gesamt"):
+            pipeline.run_store_pipeline(
+                p["store"], p["sorted"], workers=args.workers, symmetry_engine=args.symmetry_engine,
+                export=not args.no_export,
+            )
+    else:
+        with metriken.timer("segmentierung", "gesamt"):
+            segmentierung.prepare_dataset(
+                p["raw"], p["processed"], workers=args.workers, cache_dir=cache_dir,
+                manifest_path=manifest.path_for(p["sorted"]), segmentation_engine=args.segmentation,
+            )
+        if not os.listdir(p["processed"]) and not args.shard:
+            print("Fehler: Keine Bilder verarbeitet.")
+            sys.exit(1)
+
+        with metriken.timer("bruch", "gesamt"):
+            bruch.sort_images(p["processed"], p["sorted"], workers=args.workers, cache_dir=cache_dir)
+        with metriken.timer("rest", "gesamt"):
+            rest.run_complexity_check(p["sorted"], workers=args.workers)
+        with metriken.timer("farb", "gesamt"):
+            farb.run_color_check(p["sorted"], workers=args.workers)
+        with metriken.timer("symmetrie", "gesamt"):
+            symmetrie.run_symmetry_check(p["sorted"], workers=args.workers, engine=args.symmetry_engine)
+
+    if cache_dir:
+        cache.evict(cache_dir, args.cache_max_mb * 1024 ** 2)
 
-    bruch.sort_images(p["processed"], p["sorted"])
-    rest.run_complexity_check(p["sorted"])
-    farb.run_color_check(p["sorted"])
-    symmetrie.run_symmetry_check(p["sorted"])
-    ergebnis.evaluate_results(p["sorted"], p["anno"])
+    if args.shard:
+        verteilung.write_shard_info(p["output"], args.shard, p["sorted"], time.perf_counter() - started)
+    else:
+        ergebnis.evaluate_results(p["sorted"], p["anno"], error_links=args.error_links)
+    report_metrics(args)
 
     print("\nPipeline abgeschlossen.")
@@ -1,7 +1,17 @@
+import itertools
 import os
 import shutil
 import cv2
 import numpy as np
+from functools import partial
+
+from scripts import cache
+from scripts import dateien
+from scripts import gleitfenster
+from scripts import manifest
+from scripts import merkmale
+from scripts import metriken
+from scripts import puffer
 
 OUTER_BREAK_SENSITIVITY = 0.78
 MAX_RADIUS_JUMP = 6.0
@@ -13,14 +23,37 @@ MIN_WINDOW_AREA = 10
 MAX_ALLOWED_CORNERS = 3
 MIN_PEAK_DISTANCE = 60
 
+CACHE_MODULES = ["scripts.bruch", "scripts.gleitfenster", "scripts.merkmale"]
+REQUIRED_FEATURES = ["maske_1", "geometrie_maske", "konturen_aussen"]
+
+
+@merkmale.feature("geometrie_maske")
+def geometry_mask(features):
+    kernel = np.ones((3, 3), np.uint8)
+    mask = cv2.morphologyEx(merkmale.get(features, "maske_1"), cv2.MORPH_OPEN, kernel)
+    return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+
+@merkmale.feature("konturen_aussen")
+def external_contours(features):
+    contours, _ = cv2.findContours(merkmale.get(features, "geometrie_maske"), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return contours
+
+
+@merkmale.feature("konturen_baum")
+def contour_tree(features):
+    return cv2.findContours(merkmale.get(features, "geometrie_maske"), cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+
 
 def check_local_variance(distances, window_size=20):
-    padded = np.pad(distances, (window_size // 2, window_size // 2), mode='wrap')
-    local_std = []
-    for i in range(len(distances)):
-        segment = padded[i: i + window_size]
-        local_std.append(np.std(segment))
-    return np.array(local_std)
+    return gleitfenster.rolling_std(distances, window_size)
+
+
+def radial_distances(contour, center):
+    points = contour.reshape(-1, 2)
+    dx = points[:, 0] - center[0]
+    dy = points[:, 1] - center[1]
+    return np.sqrt(dx * dx + dy * dy)
 
 
 def get_radial_profile(contour):
@@ -31,13 +64,29 @@ def get_radial_profile(contour):
     cx = int(M["m10"] / M["m00"])
     cy = int(M["m01"] / M["m00"])
 
-    distances = []
-    for point in contour:
-        px, py = point[0]
-        dist = np.sqrt((px - cx) ** 2 + (py - cy) ** 2)
-        distances.append(dist)
+    return radial_distances(contour, (cx, cy)), (cx, cy)
+
+
+def find_windows(contours_all, hierarchy, center, min_center_dist=30):
+    if hierarchy is None:
+        return []
+
+    inner = np.flatnonzero(hierarchy[0][:, 3] != -1)
+    candidates = [contours_all[i] for i in inner if cv2.contourArea(contours_all[i]) > MIN_WINDOW_AREA]
+    if not candidates:
+        return []
+
+    moments = np.array([[M["m00"], M["m10"], M["m01"]] for M in map(cv2.moments, candidates)])
+    m00 = moments[:, 0]
+
+    has_area = m00 != 0
+    centroids = np.trunc(moments[has_area, 1:] / m00[has_area, None])
+    offsets = centroids - center
+
+    keep = np.zeros(len(candidates), dtype=bool)
+    keep[has_area] = (offsets * offsets).sum(axis=1) > min_center_dist * min_center_dist
 
-    return np.array(distances), (cx, cy)
+    return [cnt for cnt, k in zip(candidates, keep) if k]
 
 
 def count_peaks(values, window=10, min_dist=200):
@@ -47,50 +96,24 @@ def count_peaks(values, window=10, min_dist=200):
 
     smoothed = np.convolve(values, np.ones(window) / window, mode='same')
 
-    candidates = []
     lookahead = 5
-    padded = np.pad(smoothed, (lookahead, lookahead), mode='wrap')
+    windows = gleitfenster.sliding_windows(smoothed, 2 * lookahead + 1, lookahead)
 
-    for i in range(n):
-        current_val = padded[i + lookahead]
-        segment = padded[i: i + 2 * lookahead + 1]
+    is_peak = (windows.argmax(axis=1) == lookahead) & (smoothed > windows.min(axis=1) + 2)
+    candidates = np.flatnonzero(is_peak)
 
-        if current_val == np.max(segment) and current_val > np.min(segment) + 2:
-            if np.argmax(segment) == lookahead:
-                candidates.append((i, current_val))
-
-    if not candidates:
+    if len(candidates) == 0:
         return 0
 
-    candidates.sort(key=lambda x: x[1], reverse=True)
-
-    final_peaks = []
-
-    for idx, val in candidates:
-        is_too_close = False
-        for kept_idx in final_peaks:
-            dist = abs(idx - kept_idx)
-            dist = min(dist, n - dist)
-
-            if dist < min_dist:
-                is_too_close = True
-                break
-
-        if not is_too_close:
-            final_peaks.append(idx)
+    final_peaks = gleitfenster.circular_nms(candidates, smoothed[candidates], n, min_dist)
 
     return len(final_peaks)
 
 
-def analyze_snack_geometry(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-
-    kernel = np.ones((3, 3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+def analyze_snack_geometry(image, features=None):
+    features = merkmale.ensure(image, features)
 
-    contours_ext, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    contours_ext = merkmale.get(features, "konturen_aussen")
     if not contours_ext:
         return "Rest", "Kein Objekt"
     outer_contour = max(contours_ext, key=cv2.contourArea)
@@ -98,10 +121,7 @@ def analyze_snack_geometry(image):
     (x_fl, y_fl), _ = cv2.minEnclosingCircle(outer_contour)
     cX, cY = int(x_fl), int(y_fl)
 
-    dists_outer = []
-    for p in outer_contour:
-        dists_outer.append(np.sqrt((p[0][0] - cX) ** 2 + (p[0][1] - cY) ** 2))
-    dists_outer = np.array(dists_outer)
+    dists_outer = radial_distances(outer_contour, (cX, cY))
 
     if len(dists_outer) > 0:
         w = 15
@@ -116,17 +136,8 @@ def analyze_snack_geometry(image):
         if np.max(loc_var) > LOCAL_VARIANCE_THRESHOLD:
             return "Bruch", f"Äußerer Bruch: Unruhig (Var {np.max(loc_var):.1f})"
 
-    contours_all, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
-    valid_windows = []
-
-    if hierarchy is not None:
-        for i, cnt in enumerate(contours_all):
-            if hierarchy[0][i][3] != -1 and cv2.contourArea(cnt) > MIN_WINDOW_AREA:
-                Mh = cv2.moments(cnt)
-                if Mh["m00"] != 0:
-                    hx, hy = int(Mh["m10"] / Mh["m00"]), int(Mh["m01"] / Mh["m00"])
-                    if np.sqrt((hx - cX) ** 2 + (hy - cY) ** 2) > 30:
-                        valid_windows.append(cnt)
+    contours_all, hierarchy = merkmale.get(features, "konturen_baum")
+    valid_windows = find_windows(contours_all, hierarchy, (cX, cY))
 
     num_windows = len(valid_windows)
     if num_windows < MIN_WINDOWS_FOR_BRUCH:
@@ -149,7 +160,53 @@ def analyze_snack_geometry(image):
     return "Normal", "OK"
 
 
-def sort_images(source_dir, target_dir):
+def sorted_name(root, source_dir, file_name):
+    parent = os.path.basename(root)
+    if os.path.abspath(root) == os.path.abspath(source_dir):
+        return file_name
+    return f"{parent}_{file_name}"
+
+
+def load_file(src_path, cache_dir=None):
+    try:
+        with metriken.timer("bruch", "lesen"):
+            data = cache.read_bytes(src_path)
+    except OSError:
+        return None
+
+    metriken.count_image("bruch")
+    key = cache.stage_key("bruch", data, CACHE_MODULES) if cache_dir else None
+    cached = cache.load(cache_dir, key)
+    if cached is not None:
+        meta, _ = cached
+        return {"key": key, "cached": (meta["category"], meta["reason"])}
+
+    with metriken.timer("bruch", "decode"):
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return {"key": key, "image": img}
+
+
+def classify_loaded(loaded, cache_dir=None):
+    if loaded is None:
+        return None
+    if "cached" in loaded:
+        cat, reason = loaded["cached"]
+    else:
+        with metriken.timer("bruch", "compute"):
+            cat, reason = analyze_snack_geometry(loaded["image"])
+        cache.store(cache_dir, loaded["key"], {"category": cat, "reason": reason})
+    metriken.record_branch("bruch", reason)
+    return cat, reason
+
+
+def copy_file(src_path, dst):
+    with metriken.timer("bruch", "schreiben"):
+        shutil.copy(src_path, dst)
+
+
+def sort_images(source_dir, target_dir, workers=1, cache_dir=None):
     print("\n[bruch.py] Starte Analyse (Geometrie + Peak Merging)...")
     classes = ["Normal", "Bruch", "Rest"]
     shutil.rmtree(target_dir, ignore_errors=True)
@@ -157,31 +214,33 @@ def sort_images(source_dir, target_dir):
         os.makedirs(os.path.join(target_dir, c), exist_ok=True)
 
     stats = {k: 0 for k in classes}
-    collected_files = {"Normal": [], "Bruch": [], "Rest": []}
 
-    for root, dirs, files in os.walk(source_dir):
-        for file_name in files:
-            if not file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
-                continue
-            src_path = os.path.join(root, file_name)
-            img = cv2.imread(src_path)
-            if img is None:
+    jobs = (
+        (os.path.join(root, file_name), sorted_name(root, source_dir, file_name))
+        for root, file_name in dateien.scan_images(source_dir)
+    )
+    jobs, pending = itertools.tee(jobs)
+
+    results = puffer.imap(
+        partial(load_file, cache_dir=cache_dir),
+        partial(classify_loaded, cache_dir=cache_dir),
+        (src_path for src_path, _ in pending),
+        workers,
+    )
+
+    with puffer.write_back() as write, manifest.writer(manifest.path_for(target_dir)) as record:
+        for (src_path, name), result in zip(jobs, results):
+            if result is None:
                 continue
 
-            cat, reason = analyze_snack_geometry(img)
+            cat, reason = result
             if cat not in classes:
                 cat = "Rest"
 
-            parent = os.path.basename(root)
-            if os.path.abspath(root) == os.path.abspath(source_dir):
-                name = file_name
-            else:
-                name = f"{parent}_{file_name}"
-
             dst = os.path.join(target_dir, cat, name)
-            shutil.copy(src_path, dst)
+            write(copy_file, src_path, dst)
+            record({"datei": name, "klasse": cat, "grund": reason, "stufe": "bruch", "pfad": dst})
             stats[cat] += 1
-            collected_files[cat].append(src_path)
             if cat == "Bruch":
                 print(f"   [Bruch] {name} -> {reason}")
 
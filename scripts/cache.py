@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+CACHE_VERSION = 1
+
+
+def read_bytes(path):
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def content_hash(data):
+    return hashlib.blake2b(memoryview(data), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _source_digest(module_name):
+    module = sys.modules[module_name]
+    with open(module.__file__, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+
+def settings_hash(module_names, extra=None):
+    settings = {"version": CACHE_VERSION, "extra": extra}
+    for name in module_names:
+        module = sys.modules[name]
+        constants = {k: v for k, v in vars(module).items() if k.isupper() and isinstance(v, (int, float, str, bool, tuple))}
+        settings[name] = {"source": _source_digest(name), "constants": constants}
+    blob = json.dumps(settings, sort_keys=True, default=repr).encode('utf-8')
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def stage_key(stage, data, module_names, extra=None):
+    return f"{stage}-{settings_hash(module_names, extra)}-{content_hash(data)}"
+
+
+def _entry_paths(cache_dir, key):
+    digest = key.rsplit('-', 1)[-1]
+    folder = os.path.join(cache_dir, digest[:2])
+    return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.bin")
+
+
+def load(cache_dir, key):
+    if not cache_dir:
+        return None
+
+    meta_path, payload_path = _entry_paths(cache_dir, key)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        payload = read_bytes(payload_path) if meta.get("has_payload") else None
+    except (OSError, ValueError):
+        return None
+
+    os.utime(meta_path)
+    return meta, payload
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def store(cache_dir, key, meta, payload=None):
+    if not cache_dir:
+        return
+
+    meta_path, payload_path = _entry_paths(cache_dir, key)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    meta = dict(meta, has_payload=payload is not None)
+
+    try:
+        if payload is not None:
+            _write_atomic(payload_path, lambda p: np.asarray(payload, dtype=np.uint8).tofile(p))
+
+        def write_meta(p):
+            with open(p, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+        _write_atomic(meta_path, write_meta)
+    except OSError as e:
+        print(f"[cache.py] Eintrag {key} konnte nicht geschrieben werden: {e}")
+
+
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for file_name in files:
+            if not file_name.endswith('.json'):
+                continue
+            meta_path = os.path.join(root, file_name)
+            payload_path = meta_path[:-len('.json')] + '.bin'
+            size = os.path.getsize(meta_path)
+            if os.path.exists(payload_path):
+                size += os.path.getsize(payload_path)
+            entries.append((os.path.getmtime(meta_path), size, meta_path, payload_path))
+            total += size
+
+    entries.sort()
+    removed = 0
+    for _, size, meta_path, payload_path in entries:
+        if total <= max_bytes:
+            break
+        for path in (meta_path, payload_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+
+    print(f"[cache.py] {len(entries) - removed} Einträge ({total / 1024 ** 2:.1f} MB), {removed} verdrängt.")
+    return removed
+
+
+def clear(cache_dir):
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    print(f"[cache.py] Cache {cache_dir} geleert.")
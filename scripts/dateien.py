@@ -0,0 +1,27 @@
+import os
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def is_image(file_name):
+    return file_name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def scan_images(directory, skip=None):
+    # Liest das Verzeichnis schrittweise statt als Liste; Unterordner erst nach den Dateien.
+    # Dateien, die der Aufrufer nach dem Liefern aus dem Ordner verschiebt, stören die Aufzählung nicht.
+    subdirs = []
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif is_image(entry.name) and entry.is_file() and not (skip and skip(entry.name)):
+                yield directory, entry.name
+
+    for subdir in sorted(subdirs):
+        yield from scan_images(subdir, skip)
@@ -0,0 +1,215 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from scripts import metriken
+from scripts import parallel
+from scripts import schnittstelle
+
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_SIZE = 8
+BATCH_WAIT_MS = 2.0
+QUEUE_SIZE = 256
+MAX_BODY_BYTES = 64 * 1024 ** 2
+REQUEST_TIMEOUT = 30.0
+LATENCY_WINDOW = 1000
+
+
+def collect_batch(jobs, size, wait_s):
+    first = jobs.get()
+    if first is None:
+        return None
+
+    batch = [first]
+    deadline = time.perf_counter() + wait_s
+    while len(batch) < size:
+        remaining = deadline - time.perf_counter()
+        try:
+            job = jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait()
+        except queue.Empty:
+            break
+        if job is None:
+            jobs.put(None)
+            break
+        batch.append(job)
+    return batch
+
+
+def resolve(batch, fetch):
+    try:
+        results = fetch()
+    except Exception as e:
+        for job in batch:
+            job["future"].set_exception(e)
+        return
+    for job, result in zip(batch, results):
+        job["future"].set_result(result)
+
+
+def _dispatch(state):
+    classify = partial(
+        schnittstelle.classify_batch,
+        symmetry_engine=state["symmetry_engine"],
+        segmentation_engine=state["segmentation_engine"],
+    )
+    slots = threading.Semaphore(max(1, state["workers"]) * 2)
+
+    while True:
+        batch = collect_batch(state["jobs"], state["batch_size"], state["batch_wait_ms"] / 1000)
+        if batch is None:
+            return
+
+        with state["lock"]:
+            state["stats"]["stapel"] += 1
+            state["stats"]["stapel_bilder"] += len(batch)
+        metriken.record_branch("dienst", "Stapel")
+        metriken.record_branch("dienst", "Bilder in Stapeln", len(batch))
+        requests = [(job["data"], job["ext"], job["segmented"]) for job in batch]
+
+        if state["pool"] is None:
+            resolve(batch, partial(classify, requests))
+            continue
+
+        def done(future, batch=batch):
+            resolve(batch, partial(parallel.collect, future))
+            slots.release()
+
+        # Höchstens zwei Stapel pro Worker in Arbeit; der Rest wartet in der Schlange und bildet größere Stapel.
+        slots.acquire()
+        parallel.submit(state["pool"], classify, requests).add_done_callback(done)
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path != "/status":
+                self.send_json(404, {"fehler": "Unbekannter Pfad"})
+                return
+            self.send_json(200, status(state))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/pruefen":
+                self.send_json(404, {"fehler": "Unbekannter Pfad"})
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0 or length > MAX_BODY_BYTES:
+                self.close_connection = True
+                self.send_json(413 if length > 0 else 411, {"fehler": "Bilddaten fehlen oder sind zu groß"})
+                return
+            data = self.rfile.read(length)
+
+            query = parse_qs(url.query)
+            ext = query.get("ext", [schnittstelle.DEFAULT_EXT])[0].lower()
+            ext = ext if ext.startswith(".") else f".{ext}"
+            if not schnittstelle.supports_ext(ext):
+                self.send_json(400, {"fehler": f"Format {ext} wird nicht unterstützt"})
+                return
+            job = {
+                "data": data,
+                "ext": ext,
+                "segmented": query.get("segmentiert", ["0"])[0] in ("1", "true", "ja"),
+                "future": Future(),
+            }
+
+            start = time.perf_counter()
+            try:
+                state["jobs"].put(job, timeout=REQUEST_TIMEOUT)
+                result = job["future"].result(timeout=REQUEST_TIMEOUT)
+            except (queue.Full, TimeoutError):
+                self.send_json(503, {"fehler": "Dienst ausgelastet"})
+                return
+            except Exception as e:
+                self.send_json(500, {"fehler": str(e)})
+                return
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            with state["lock"]:
+                state["stats"]["anfragen"] += 1
+                state["latencies"].append(latency_ms)
+            result["ms"] = round(latency_ms, 2)
+            self.send_json(400 if "fehler" in result else 200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def status(state):
+    with state["lock"]:
+        stats = dict(state["stats"])
+        recent = sorted(state["latencies"])
+    stats["mittlere_stapelgroesse"] = round(stats["stapel_bilder"] / stats["stapel"], 2) if stats["stapel"] else 0
+    if recent:
+        stats["latenz_ms"] = {
+            "mittel": round(sum(recent) / len(recent), 2),
+            "p95": round(recent[min(len(recent) - 1, int(0.95 * len(recent)))], 2),
+            "max": round(recent[-1], 2),
+        }
+    return stats
+
+
+def run_server(host=HOST, port=PORT, workers=1, symmetry_engine=None, batch_size=BATCH_SIZE,
+               batch_wait_ms=BATCH_WAIT_MS, ready=None, segmentation_engine=None):
+    state = {
+        "jobs": queue.Queue(maxsize=QUEUE_SIZE),
+        "workers": workers,
+        "symmetry_engine": symmetry_engine,
+        "segmentation_engine": segmentation_engine,
+        "batch_size": max(1, batch_size),
+        "batch_wait_ms": batch_wait_ms,
+        "pool": parallel.create_pool(workers) if workers > 1 else None,
+        "lock": threading.Lock(),
+        "stats": {"anfragen": 0, "stapel": 0, "stapel_bilder": 0},
+        "latencies": deque(maxlen=LATENCY_WINDOW),
+    }
+
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    dispatcher = threading.Thread(target=_dispatch, args=(state,), daemon=True)
+    dispatcher.start()
+
+    print(f"\n[dienst.py] Prüfdienst auf http://{host}:{server.server_address[1]} "
+          f"({workers} Worker, Stapel bis {state['batch_size']}, Wartezeit {batch_wait_ms:g} ms)...")
+    print("   -> POST /pruefen (Bilddaten im Body, optional ?ext=.png&segmentiert=1), GET /status")
+    print("   -> Beenden mit Strg+C")
+    if ready is not None:
+        ready(server)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[dienst.py] Beende Dienst...")
+    finally:
+        server.server_close()
+        state["jobs"].put(None)
+        dispatcher.join()
+        if state["pool"] is not None:
+            state["pool"].shutdown()
+
+    stats = status(state)
+    print(f"[dienst.py] {stats['anfragen']} Anfragen in {stats['stapel']} Stapeln "
+          f"(Mittel {stats['mittlere_stapelgroesse']} Bilder pro Stapel).")
+    if "latenz_ms" in stats:
+        latency = stats["latenz_ms"]
+        print(f"   -> Latenz Mittel {latency['mittel']:.1f} ms, p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms")
+    return stats
@@ -1,6 +1,14 @@
 import os
 import shutil
 import csv
+import sqlite3
+import time
+
+from scripts import dateien
+from scripts import manifest
+
+AMBIGUOUS = "Mehrdeutig"
+FRAME_SEVERITY = ["Bruch", "Rest", "Farbfehler", "Normal"]
 
 
 def get_true_label(raw_label):
@@ -24,118 +32,234 @@ def get_true_label(raw_label):
     return "Rest"
 
 
-def evaluate_results(sorted_dir, csv_path):
-    print(f"\n[ergebnis.py] Starte Verifizierung mit {csv_path}...")
+def ground_truth_key(image_path):
+    parts = image_path.split('/')
+    if len(parts) >= 2:
+        return f"{parts[-2]}/{parts[-1]}".lower()
+    return os.path.basename(image_path).lower()
+
+
+def parse_sorted_filename(filename):
+    filename_clean = filename.lower()
+    score = None
+    if "_" in filename_clean:
+        prefix, rest = filename_clean.split('_', 1)
+        try:
+            score = float(prefix)
+            filename_clean = rest
+        except ValueError:
+            pass
+    return score, filename_clean
 
+
+def load_ground_truth(csv_path):
     ground_truth = {}
+    keys_by_basename = {}
 
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                full_path_csv = row['image']
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            key = ground_truth_key(row['image'])
+            ground_truth[key] = get_true_label(row['label'])
+            keys_by_basename.setdefault(key.rsplit('/', 1)[-1], set()).add(key)
+
+    basename_index = {}
+    for basename, keys in keys_by_basename.items():
+        labels = {ground_truth[k] for k in keys}
+        basename_index[basename] = labels.pop() if len(labels) == 1 else AMBIGUOUS
+
+    return ground_truth, basename_index
 
-                parts = full_path_csv.split('/')
-                if len(parts) >= 2:
-                    key = f"{parts[-2]}/{parts[-1]}".lower()
-                else:
-                    key = os.path.basename(full_path_csv).lower()
 
-                label_raw = row['label']
-                true_cat = get_true_label(label_raw)
+def lookup_true_label(ground_truth, basename_index, filename_clean):
+    reconstructed_key = filename_clean.replace('_', '/', 1)
+    if reconstructed_key in ground_truth:
+        return ground_truth[reconstructed_key]
+    return basename_index.get(filename_clean)
 
-                ground_truth[key] = true_cat
 
+def scan_folders(sorted_dir, categories):
+    for current_folder in categories:
+        for root, filename in dateien.scan_images(os.path.join(sorted_dir, current_folder)):
+            yield filename, current_folder, os.path.join(root, filename)
+
+
+def open_verdicts(sorted_dir, categories):
+    manifest_path = manifest.path_for(sorted_dir)
+    if os.path.exists(manifest_path):
+        return manifest.connect(manifest_path), manifest_path
+
+    # Ohne Manifest landen die Ordnerinhalte in einer temporären Datenbank auf der Platte.
+    conn = sqlite3.connect("")
+    conn.execute(manifest.SCHEMA)
+    conn.executemany("INSERT OR REPLACE INTO urteile (datei, klasse, pfad) VALUES (?, ?, ?)", scan_folders(sorted_dir, categories))
+    return conn, sorted_dir
+
+
+def load_ground_truth_table(conn, csv_path):
+    conn.execute("CREATE TEMP TABLE soll (schluessel TEXT PRIMARY KEY, basis TEXT, klasse TEXT)")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        rows = (
+            (key, key.rsplit('/', 1)[-1], get_true_label(row['label']))
+            for row in csv.DictReader(f)
+            for key in [ground_truth_key(row['image'])]
+        )
+        conn.executemany("INSERT OR REPLACE INTO soll VALUES (?, ?, ?)", rows)
+    conn.execute("CREATE INDEX temp.soll_basis ON soll (basis)")
+
+
+FRAMES_QUERY = """
+SELECT
+    bild,
+    schwere,
+    objekte,
+    (SELECT klasse FROM soll WHERE schluessel = soll_schluessel(bild)),
+    (SELECT CASE WHEN COUNT(*) = 0 THEN NULL WHEN COUNT(DISTINCT klasse) = 1 THEN MIN(klasse) ELSE ? END
+     FROM soll WHERE basis = bereinigt(bild))
+FROM (
+    SELECT COALESCE(bild, datei) AS bild, MIN({severity}) AS schwere, COUNT(*) AS objekte
+    FROM urteile
+    WHERE klasse IN ({placeholders})
+    GROUP BY COALESCE(bild, datei)
+)
+"""
+
+
+def iter_frames(conn, categories):
+    conn.create_function("bereinigt", 1, lambda name: parse_sorted_filename(name)[1], deterministic=True)
+    conn.create_function(
+        "soll_schluessel", 1, lambda name: parse_sorted_filename(name)[1].replace('_', '/', 1), deterministic=True
+    )
+    severity = "CASE klasse " + " ".join(f"WHEN '{c}' THEN {i}" for i, c in enumerate(FRAME_SEVERITY)) + " END"
+
+    query = FRAMES_QUERY.format(severity=severity, placeholders=", ".join("?" * len(categories)))
+    for frame, severity, objects, direct, by_basename in conn.execute(query, (AMBIGUOUS, *categories)):
+        yield frame, FRAME_SEVERITY[severity], objects, direct if direct is not None else by_basename
+
+
+def frame_objects(conn, frame):
+    cursor = conn.execute("SELECT datei, klasse, pfad FROM urteile WHERE COALESCE(bild, datei) = ?", (frame,))
+    return [{"datei": datei, "klasse": klasse, "pfad": pfad} for datei, klasse, pfad in cursor]
+
+
+def reset_error_links(falsch_dir):
+    if os.path.lexists(falsch_dir):
+        shutil.rmtree(falsch_dir)
+    os.makedirs(falsch_dir)
+
+
+def link_errors(falsch_dir, errors):
+    linked = 0
+    for true_cat, row in errors:
+        if not row["pfad"] or not os.path.exists(row["pfad"]):
+            continue
+        new_name = f"SOLL_{true_cat}_IST_{row['klasse']}_{os.path.basename(row['pfad'])}"
+        try:
+            os.symlink(os.path.abspath(row["pfad"]), os.path.join(falsch_dir, new_name))
+            linked += 1
+        except OSError as e:
+            print(f"Fehler beim Verlinken von {row['datei']}: {e}")
+    return linked
+
+
+def evaluate_results(sorted_dir, csv_path, error_links=False):
+    print(f"\n[ergebnis.py] Starte Verifizierung mit {csv_path}...")
+    start = time.perf_counter()
+
+    categories = ["Normal", "Bruch", "Farbfehler", "Rest"]
+    conn, source = open_verdicts(sorted_dir, categories)
+
+    try:
+        load_ground_truth_table(conn, csv_path)
     except Exception as e:
+        conn.close()
         print(f"Fehler beim Lesen der CSV: {e}")
         return
 
-    categories = ["Normal", "Bruch", "Farbfehler", "Rest"]
-
     stats = {
         "soll": {c: 0 for c in categories},
-        "hits": {c: 0 for c in categories},
-        "misses": 0
+        "ist": {c: 0 for c in categories},
+        "matrix": {t: {c: 0 for c in categories} for t in categories},
+        "misses": 0,
+        "ambiguous": 0
     }
 
-    for tc in ground_truth.values():
+    for tc, count in conn.execute("SELECT klasse, COUNT(*) FROM soll GROUP BY klasse"):
         if tc in stats["soll"]:
-            stats["soll"][tc] += 1
+            stats["soll"][tc] += count
 
     falsch_dir = os.path.join(sorted_dir, "Falsch")
-    if os.path.exists(falsch_dir):
-        shutil.rmtree(falsch_dir)
-    os.makedirs(falsch_dir)
-
+    if error_links:
+        reset_error_links(falsch_dir)
+    linked = 0
     processed_count = 0
+    frame_count = 0
+    objects = 0
 
-    for current_folder in categories:
-        folder_path = os.path.join(sorted_dir, current_folder)
-
-        for root, _, files in os.walk(folder_path):
-            for filename in files:
-                if not filename.lower().endswith(('.jpg', '.png', '.jpeg')):
-                    continue
-
-                filename_clean = filename.lower()
-                if "_" in filename_clean:
-                    parts = filename_clean.split('_', 1)
-                    try:
-                        float(parts[0])
-                        filename_clean = parts[1]
-                    except ValueError:
-                        pass
-
-                reconstructed_key = filename_clean.replace('_', '/', 1)
-
-                found_true_cat = None
-                if reconstructed_key in ground_truth:
-                    found_true_cat = ground_truth[reconstructed_key]
-                else:
-                    matches = [val for k, val in ground_truth.items() if k.endswith(f"/{filename_clean}") or k == filename_clean]
-                    if len(matches) > 0:
-                        found_true_cat = matches[0]
-
-                if found_true_cat is None:
-                    continue
-
-                processed_count += 1
-
-                if found_true_cat == current_folder:
-                    stats["hits"][found_true_cat] += 1
-                else:
-                    stats["misses"] += 1
-                    new_name = f"SOLL_{found_true_cat}_IST_{current_folder}_{filename}"
-                    try:
-                        shutil.move(os.path.join(root, filename), os.path.join(falsch_dir, new_name))
-                    except Exception as e:
-                        print(f"Fehler beim Verschieben von {filename}: {e}")
-
-    print("\n" + "=" * 65)
+    try:
+        for frame, predicted, frame_objects_count, found_true_cat in iter_frames(conn, categories):
+            frame_count += 1
+            objects += frame_objects_count
+
+            if found_true_cat == AMBIGUOUS:
+                stats["ambiguous"] += 1
+                continue
+
+            if found_true_cat not in categories:
+                continue
+
+            processed_count += 1
+            stats["matrix"][found_true_cat][predicted] += 1
+            stats["ist"][predicted] += 1
+
+            if found_true_cat != predicted:
+                stats["misses"] += 1
+                if error_links:
+                    linked += link_errors(falsch_dir, ((found_true_cat, row) for row in frame_objects(conn, frame)))
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 78)
     print("   ERGEBNIS EVALUIERUNG (Vergleich mit Ground-Truth)")
-    print("=" * 65)
-    print(f"{'Kategorie':<15} | {'Soll (CSV)':<12} | {'Treffer (Ist)':<15} | {'Genauigkeit':<10}")
-    print("-" * 65)
+    print("=" * 78)
+    print(f"{'Kategorie':<15} | {'Soll (CSV)':<12} | {'Treffer (Ist)':<15} | {'Genauigkeit':<11} | {'Präzision':<10}")
+    print("-" * 78)
 
     total_soll = 0
     total_hits = 0
 
     for cat in categories:
         s = stats["soll"][cat]
-        h = stats["hits"][cat]
+        h = stats["matrix"][cat][cat]
         acc = (h / s * 100) if s > 0 else 0
-        print(f"{cat:<15} | {s:<12} | {h:<15} | {acc:.1f}%")
+        prec = (h / stats["ist"][cat] * 100) if stats["ist"][cat] > 0 else 0
+        acc_text = f"{acc:.1f}%"
+        print(f"{cat:<15} | {s:<12} | {h:<15} | {acc_text:<11} | {prec:.1f}%")
         total_soll += s
         total_hits += h
 
-    print("-" * 65)
+    print("-" * 78)
     tot_acc = (total_hits / total_soll * 100) if total_soll > 0 else 0
 
     missing = total_soll - processed_count
     print(f"{'GESAMT':<15} | {total_soll:<12} | {total_hits:<15} | {tot_acc:.1f}%")
 
-    if missing > 0:
-        print(f"\n[Info] {missing} Bilder aus der CSV wurden nicht in den Ordnern gefunden.")
+    print(f"\nKonfusionsmatrix (Zeilen: Soll, Spalten: Ist)")
+    print(f"{'':<15} | " + " | ".join(f"{c:>10}" for c in categories))
+    for true_cat in categories:
+        print(f"{true_cat:<15} | " + " | ".join(f"{stats['matrix'][true_cat][c]:>10}" for c in categories))
 
-    print(f"\nFalsch zugeordnete Bilder ({stats['misses']}) sind in '{falsch_dir}'")
-    print("=" * 65)
+    if missing > 0:
+        print(f"\n[Info] {missing} Bilder aus der CSV wurden nicht in den Ergebnissen gefunden.")
+
+    if stats["ambiguous"] > 0:
+        print(f"[Info] {stats['ambiguous']} Bilder übersprungen: Dateiname passt auf mehrere CSV-Einträge mit unterschiedlichem Label.")
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if objects > frame_count:
+        print(f"[Info] {objects} Objekte in {frame_count} Bildern; ein Bild zählt mit seinem schwersten Befund.")
+    print(f"\nFalsch zugeordnete Bilder: {stats['misses']} (Quelle: {source}, {elapsed_ms:.1f} ms)")
+    if error_links:
+        print(f"   -> {linked} Verknüpfungen in '{falsch_dir}'")
+    print("=" * 78)
+    return stats
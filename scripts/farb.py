@@ -1,27 +1,85 @@
 import cv2
+import itertools
 import numpy as np
 import os
 
-
-def detect_defects(image, spot_threshold=43, debug=False):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, mask_obj = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-    kernel_erode = np.ones((13, 13), np.uint8)
-    mask_analysis = cv2.erode(mask_obj, kernel_erode, iterations=1)
-    kernel_morph = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (21, 21))
-    blackhat_img = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, kernel_morph)
+from scripts import dateien
+from scripts import manifest
+from scripts import merkmale
+from scripts import metriken
+from scripts import puffer
+
+SPOT_THRESHOLD = 20
+BURN_LOWER = np.array([0, 30, 0])
+BURN_UPPER = np.array([180, 255, 95])
+REQUIRED_FEATURES = ["grau", "maske_10", "brand_maske"]
+
+BLACKHAT_SIZE = 21
+BLACKHAT_SCALE = 1.0
+BLACKHAT_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (BLACKHAT_SIZE, BLACKHAT_SIZE))
+ERODE_KERNEL = np.ones((13, 13), np.uint8)
+OPEN_KERNEL = np.ones((3, 3), np.uint8)
+ROI_PADDING = BLACKHAT_SIZE
+
+
+@merkmale.feature("brand_maske")
+def burn_mask(features):
+    return cv2.inRange(merkmale.get(features, "hsv"), BURN_LOWER, BURN_UPPER)
+
+
+def blackhat_kernel(scale=1.0):
+    if scale == 1.0:
+        return BLACKHAT_KERNEL
+    size = max(3, int(round(BLACKHAT_SIZE * scale)) | 1)
+    return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+
+
+def object_roi(mask, padding=ROI_PADDING):
+    x, y, w, h = cv2.boundingRect(mask)
+    if w == 0 or h == 0:
+        return None
+    height, width = mask.shape[:2]
+    x0, y0 = max(0, x - padding), max(0, y - padding)
+    x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+    return slice(y0, y1), slice(x0, x1)
+
+
+def blackhat(gray, scale=1.0):
+    if scale == 1.0:
+        return cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, BLACKHAT_KERNEL)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    result = cv2.morphologyEx(small, cv2.MORPH_BLACKHAT, blackhat_kernel(scale))
+    return cv2.resize(result, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_LINEAR)
+
+
+def roi_burn_mask(features, roi):
+    if "brand_maske" in features:
+        return features["brand_maske"][roi]
+    hsv = features["hsv"][roi] if "hsv" in features else cv2.cvtColor(features["bild"][roi], cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, BURN_LOWER, BURN_UPPER)
+
+
+def detect_defects(image, spot_threshold=43, debug=False, features=None):
+    features = merkmale.ensure(image, features)
+    mask_obj = merkmale.get(features, "maske_10")
+    mask_analysis = cv2.erode(mask_obj, ERODE_KERNEL, iterations=1)
+    roi = object_roi(mask_analysis)
+    if roi is None:
+        return {"is_defective": False, "spot_area": 0, "contours": []}
+
+    gray = merkmale.get(features, "grau")[roi]
+    mask_analysis = mask_analysis[roi]
+    blackhat_img = blackhat(gray, BLACKHAT_SCALE)
     _, mask_defects_contrast = cv2.threshold(blackhat_img, 45, 255, cv2.THRESH_BINARY)
 
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    lower_burn = np.array([0, 30, 0])
-    upper_burn = np.array([180, 255, 95])
-    mask_burn = cv2.inRange(hsv, lower_burn, upper_burn)
+    mask_burn = roi_burn_mask(features, roi)
 
     combined_defects = cv2.bitwise_or(mask_defects_contrast, mask_burn)
     valid_defects = cv2.bitwise_and(combined_defects, combined_defects, mask=mask_analysis)
-    valid_defects = cv2.morphologyEx(valid_defects, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    valid_defects = cv2.morphologyEx(valid_defects, cv2.MORPH_OPEN, OPEN_KERNEL)
 
-    contours, _ = cv2.findContours(valid_defects, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    offset = (roi[1].start, roi[0].start)
+    contours, _ = cv2.findContours(valid_defects, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
 
     significant_contours = []
     total_defect_area = 0
@@ -42,47 +100,79 @@ def detect_defects(image, spot_threshold=43, debug=False):
     }
 
 
-def run_color_check(sorted_dir):
-    print("\n[farb.py] Starte Farbprüfung (Strenge Filterung + Rand-Ignoranz)...")
+def annotate_defects(image, contours):
+    cv2.drawContours(image, contours, -1, (0, 0, 255), 2)
 
-    defect_dir = os.path.join(sorted_dir, "Farbfehler")
-    os.makedirs(defect_dir, exist_ok=True)
+    for cnt in contours:
+        (x, y), radius = cv2.minEnclosingCircle(cnt)
+        center = (int(x), int(y))
+        radius = int(radius) + 8
+        cv2.circle(image, center, radius, (0, 0, 255), 2)
 
-    check_classes = ["Normal"]
-    moved_count = 0
+    return image
+
+
+def load_image(file_path):
+    with metriken.timer("farb", "decode"):
+        return cv2.imread(file_path)
 
-    for cls in check_classes:
-        class_path = os.path.join(sorted_dir, cls)
 
-        for root, _, files in os.walk(class_path):
-            for file_name in files:
-                if not file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    continue
+def check_loaded(image):
+    if image is None:
+        return None
 
-                file_path = os.path.join(root, file_name)
-                image = cv2.imread(file_path)
+    metriken.count_image("farb")
+    with metriken.timer("farb", "compute"):
+        result = detect_defects(image, spot_threshold=SPOT_THRESHOLD)
+    metriken.record_branch("farb", "Farbfehler" if result["is_defective"] else "OK")
 
-                if image is None:
-                    continue
+    return (image if result["is_defective"] else None), result
 
-                result = detect_defects(image, spot_threshold=20)
 
-                if result["is_defective"]:
-                    cv2.drawContours(image, result["contours"], -1, (0, 0, 255), 2)
+def store_defect(image, result, file_path, target_path, errors):
+    with metriken.timer("farb", "encode"):
+        annotate_defects(image, result["contours"])
+        cv2.imwrite(target_path, image)
 
-                    for cnt in result["contours"]:
-                        (x, y), radius = cv2.minEnclosingCircle(cnt)
-                        center = (int(x), int(y))
-                        radius = int(radius) + 8
-                        cv2.circle(image, center, radius, (0, 0, 255), 2)
+    try:
+        os.remove(file_path)
+    except OSError as e:
+        errors.append(file_path)
+        print(f"Fehler beim Löschen von {file_path}: {e}")
 
-                    target_path = os.path.join(defect_dir, file_name)
-                    cv2.imwrite(target_path, image)
 
-                    try:
-                        os.remove(file_path)
-                        moved_count += 1
-                    except OSError as e:
-                        print(f"Fehler beim Löschen von {file_path}: {e}")
+def run_color_check(sorted_dir, workers=1):
+    print("\n[farb.py] Starte Farbprüfung (Strenge Filterung + Rand-Ignoranz)...")
+
+    defect_dir = os.path.join(sorted_dir, "Farbfehler")
+    os.makedirs(defect_dir, exist_ok=True)
+
+    check_classes = ["Normal"]
+    moved_count = 0
+
+    jobs = (
+        (os.path.join(root, file_name), os.path.join(defect_dir, file_name))
+        for cls in check_classes
+        for root, file_name in dateien.scan_images(os.path.join(sorted_dir, cls))
+    )
+    jobs, pending = itertools.tee(jobs)
+
+    results = puffer.imap(load_image, check_loaded, (file_path for file_path, _ in pending), workers)
+    errors = []
+
+    with puffer.write_back() as write, manifest.writer(manifest.path_for(sorted_dir)) as record:
+        for (file_path, target_path), checked in zip(jobs, results):
+            if checked is None:
+                continue
+
+            image, result = checked
+            row = {"datei": os.path.basename(file_path), "fleckflaeche": result["spot_area"]}
+            if image is not None:
+                write(store_defect, image, result, file_path, target_path, errors)
+                moved_count += 1
+                row.update(klasse="Farbfehler", grund=f"Farbfehler (Fläche {result['spot_area']:.0f})", stufe="farb", pfad=target_path)
+            record(row)
+
+    moved_count -= len(errors)
 
     print(f"[farb.py] Farbprüfung abgeschlossen. {moved_count} Bilder markiert und verschoben.")
@@ -0,0 +1,52 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_windows(values, window, offset=None):
+    if offset is None:
+        offset = window // 2
+    padded = np.pad(values, (offset, window - 1 - offset), mode='wrap')
+    return sliding_window_view(padded, window)
+
+
+def _window_sums(values, window, offset):
+    padded = np.pad(values, (offset, window - 1 - offset), mode='wrap')
+    cumsum = np.concatenate(([0.0], np.cumsum(padded, dtype=np.float64)))
+    return cumsum[window:] - cumsum[:-window]
+
+
+def rolling_std(values, window, offset=None):
+    if offset is None:
+        offset = window // 2
+    values = np.asarray(values, dtype=np.float64)
+    centered = values - values.mean()
+
+    mean = _window_sums(centered, window, offset) / window
+    mean_sq = _window_sums(centered * centered, window, offset) / window
+
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+
+def circular_distance(a, b, n):
+    dist = np.abs(np.asarray(a) - b)
+    return np.minimum(dist, n - dist)
+
+
+def circular_nms(indices, scores, n, min_dist):
+    indices = np.asarray(indices)
+    if len(indices) == 0:
+        return indices
+
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    indices = indices[order]
+
+    alive = np.ones(len(indices), dtype=bool)
+    kept = []
+
+    while alive.any():
+        pos = int(np.argmax(alive))
+        kept.append(indices[pos])
+        alive[pos] = False
+        alive &= circular_distance(indices, indices[pos], n) >= min_dist
+
+    return np.array(kept)
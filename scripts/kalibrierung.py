@@ -0,0 +1,300 @@
+import csv
+import itertools
+import json
+import os
+from functools import partial
+
+import cv2
+import numpy as np
+
+from scripts import bruch
+from scripts import dateien
+from scripts import ergebnis
+from scripts import farb
+from scripts import merkmale
+from scripts import parallel
+from scripts import rest
+from scripts import segmentierung
+from scripts import symmetrie
+
+CLASSES = ["Normal", "Bruch", "Rest", "Farbfehler"]
+NORMAL, BRUCH, REST, FARBFEHLER = range(4)
+SEVERITY_RANK = np.array([ergebnis.FRAME_SEVERITY.index(c) for c in CLASSES])
+BY_SEVERITY = np.array([CLASSES.index(c) for c in ergebnis.FRAME_SEVERITY])
+
+FEATURE_FIELDS = [
+    "objekt", "radius_quote_11", "max_gradient", "max_lokal_std", "fenster", "max_ecken",
+    "kantensumme", "kantensumme_bereinigt", "fleckflaeche", "symmetrie",
+]
+
+PARAMETERS = {
+    "OUTER_BREAK_SENSITIVITY": bruch,
+    "MAX_RADIUS_JUMP": bruch,
+    "LOCAL_VARIANCE_THRESHOLD": bruch,
+    "MAX_ALLOWED_CORNERS": bruch,
+    "MIN_EDGE_SUM": rest,
+    "MAX_EDGE_SUM": rest,
+    "SPOT_THRESHOLD": farb,
+}
+
+SEARCH_STEPS = 5
+SEARCH_SPREAD = 0.2
+CHUNK_SIZE = 4096
+TOP_RESULTS = 10
+
+
+def current_parameters():
+    return {name: getattr(module, name) for name, module in PARAMETERS.items()}
+
+
+def extract_features(image):
+    features = merkmale.for_image(image)
+    row = dict.fromkeys(FEATURE_FIELDS, 0.0)
+    row["radius_quote_11"] = np.inf
+
+    contours_ext = merkmale.get(features, "konturen_aussen")
+    row["objekt"] = 1.0 if contours_ext else 0.0
+    if contours_ext:
+        outer_contour = max(contours_ext, key=cv2.contourArea)
+        (x_fl, y_fl), _ = cv2.minEnclosingCircle(outer_contour)
+        center = (int(x_fl), int(y_fl))
+
+        dists_outer = bruch.radial_distances(outer_contour, center)
+        if len(dists_outer) > 0:
+            w = 15
+            d_smooth = np.convolve(dists_outer, np.ones(w) / w, mode='same')
+            ratios = np.sort(d_smooth / np.median(dists_outer))
+            if len(ratios) > 10:
+                row["radius_quote_11"] = ratios[10]
+            grad = np.abs(np.gradient(d_smooth))
+            if len(grad) > 20:
+                row["max_gradient"] = np.max(grad[10:-10])
+            row["max_lokal_std"] = np.max(bruch.check_local_variance(dists_outer, window_size=15))
+
+        contours_all, hierarchy = merkmale.get(features, "konturen_baum")
+        windows = bruch.find_windows(contours_all, hierarchy, center)
+        row["fenster"] = len(windows)
+
+        corners = [0]
+        for w_cnt in windows:
+            radii, _ = bruch.get_radial_profile(w_cnt)
+            if radii is not None and len(radii) >= 10:
+                corners.append(bruch.count_peaks(radii, window=8, min_dist=bruch.MIN_PEAK_DISTANCE))
+        row["max_ecken"] = max(corners)
+
+    edge_sum, _, binary = rest.calculate_edge_sum(image, features)
+    binary_clean = rest.remove_small_artifacts(binary, rest.MIN_OBJECT_AREA)
+    row["kantensumme"] = edge_sum
+    row["kantensumme_bereinigt"] = cv2.countNonZero(cv2.Canny(binary_clean, 50, 150))
+    row["fleckflaeche"] = farb.detect_defects(image, spot_threshold=farb.SPOT_THRESHOLD, features=features)["spot_area"]
+    row["symmetrie"] = symmetrie.get_symmetry_score(image, features=features)
+    return row
+
+
+def extract_file(job, cache_dir=None, segmentation_engine=None):
+    full_path, name = job
+    objects = segmentierung.segment_file(full_path, os.path.splitext(name)[1], cache_dir, segmentation_engine)
+    rows = []
+    for i, obj in enumerate(objects):
+        image = cv2.imdecode(obj["encoded"], cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        row = extract_features(image)
+        row["datei"] = segmentierung.object_name(name, i, len(objects))
+        row["bild"] = name
+        rows.append(row)
+    return rows
+
+
+def extract_dataset(source_dir, features_path, workers=1, cache_dir=None, segmentation_engine=None):
+    jobs = (
+        (os.path.join(root, file_name), bruch.sorted_name(root, source_dir, file_name))
+        for root, file_name in dateien.scan_images(source_dir)
+    )
+
+    print(f"[kalibrierung.py] Extrahiere Merkmale aus {source_dir}...")
+    os.makedirs(os.path.dirname(os.path.abspath(features_path)), exist_ok=True)
+    frames = 0
+    with open(features_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=["datei", "bild"] + FEATURE_FIELDS)
+        writer.writeheader()
+        for rows in parallel.imap(partial(extract_file, cache_dir=cache_dir, segmentation_engine=segmentation_engine), jobs, workers):
+            writer.writerows(rows)
+            frames += 1
+    print(f"   -> {frames} Bilder verarbeitet")
+
+
+def load_features(features_path):
+    with open(features_path, 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    names = [row.get("bild") or row["datei"] for row in rows]
+    columns = {field: np.array([float(row[field]) for row in rows]) for field in FEATURE_FIELDS}
+    return names, columns
+
+
+def frame_groups(names):
+    frames, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.flatnonzero(np.diff(inverse[order], prepend=-1))
+    return frames, order, starts
+
+
+def load_labels(frames, csv_path):
+    ground_truth, basename_index = ergebnis.load_ground_truth(csv_path)
+    labels = np.full(len(frames), -1)
+    for i, name in enumerate(frames):
+        _, filename_clean = ergebnis.parse_sorted_filename(name)
+        label = ergebnis.lookup_true_label(ground_truth, basename_index, filename_clean)
+        if label in CLASSES:
+            labels[i] = CLASSES.index(label)
+
+    soll = np.array([sum(1 for label in ground_truth.values() if label == c) for c in CLASSES])
+    return labels, soll
+
+
+def decide(columns, params):
+    f = {k: v[None, :] for k, v in columns.items()}
+    p = {k: np.asarray(v, dtype=np.float64)[:, None] for k, v in params.items()}
+
+    geometry = np.select(
+        [
+            f["objekt"] == 0,
+            f["radius_quote_11"] < p["OUTER_BREAK_SENSITIVITY"],
+            f["max_gradient"] > p["MAX_RADIUS_JUMP"],
+            f["max_lokal_std"] > p["LOCAL_VARIANCE_THRESHOLD"],
+            f["fenster"] < bruch.MIN_WINDOWS_FOR_BRUCH,
+            f["fenster"] < 6,
+            f["fenster"] > 6,
+            f["max_ecken"] > p["MAX_ALLOWED_CORNERS"],
+        ],
+        [REST, BRUCH, BRUCH, BRUCH, REST, BRUCH, REST, BRUCH],
+        default=NORMAL,
+    )
+
+    fragment = f["kantensumme"] < p["MIN_EDGE_SUM"]
+    chaos = (f["kantensumme"] > p["MAX_EDGE_SUM"]) & (f["kantensumme_bereinigt"] > p["MAX_EDGE_SUM"])
+    category = np.where((geometry != REST) & (fragment | chaos), REST, geometry)
+
+    return np.where((category == NORMAL) & (f["fleckflaeche"] > p["SPOT_THRESHOLD"]), FARBFEHLER, category)
+
+
+def frame_predictions(predicted, groups):
+    # Wie in ergebnis.evaluate_results zählt pro Bild das schwerste Urteil seiner Objekte.
+    _, order, starts = groups
+    if not len(starts):
+        return np.empty((len(predicted), 0), dtype=predicted.dtype)
+    ranks = SEVERITY_RANK[predicted[:, order]]
+    return BY_SEVERITY[np.minimum.reduceat(ranks, starts, axis=1)]
+
+
+def score(predicted, labels, groups):
+    predicted = frame_predictions(predicted, groups)
+    known = labels >= 0
+    hits = np.stack([((predicted == c) & (labels == c) & known).sum(axis=1) for c in range(len(CLASSES))], axis=1)
+    return hits
+
+
+def objective(hits, soll, target="gesamt"):
+    if target == "klassen":
+        valid = soll > 0
+        return (hits[:, valid] / soll[valid]).mean(axis=1)
+    return hits.sum(axis=1) / max(1, soll.sum())
+
+
+def is_integer(name):
+    return isinstance(current_parameters()[name], int)
+
+
+def grid_values(name, value, steps=SEARCH_STEPS, spread=SEARCH_SPREAD):
+    values = np.linspace(value * (1 - spread), value * (1 + spread), steps)
+    if is_integer(name):
+        values = np.unique(np.round(values))
+    return values
+
+
+def grid_candidates(ranges):
+    names = list(ranges)
+    combos = np.array(list(itertools.product(*(ranges[n] for n in names))), dtype=np.float64)
+    return {n: combos[:, i] for i, n in enumerate(names)}
+
+
+def random_candidates(ranges, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    candidates = {}
+    for name, values in ranges.items():
+        low, high = float(np.min(values)), float(np.max(values))
+        drawn = rng.uniform(low, high, samples)
+        candidates[name] = np.round(drawn) if is_integer(name) else drawn
+    return candidates
+
+
+def search(columns, groups, labels, soll, candidates, target="gesamt", chunk_size=CHUNK_SIZE):
+    count = len(next(iter(candidates.values())))
+    scores = np.empty(count)
+    hits_all = np.empty((count, len(CLASSES)), dtype=np.int64)
+
+    for start in range(0, count, chunk_size):
+        chunk = {k: v[start: start + chunk_size] for k, v in candidates.items()}
+        hits = score(decide(columns, chunk), labels, groups)
+        hits_all[start: start + len(hits)] = hits
+        scores[start: start + len(hits)] = objective(hits, soll, target)
+
+    return scores, hits_all
+
+
+def describe(params, hits, soll, accuracy):
+    return {
+        "genauigkeit": round(float(accuracy) * 100, 2),
+        "parameter": {k: (int(v) if is_integer(k) else round(float(v), 4)) for k, v in params.items()},
+        "treffer": {c: int(h) for c, h in zip(CLASSES, hits)},
+        "soll": {c: int(s) for c, s in zip(CLASSES, soll)},
+    }
+
+
+def calibrate(source_dir, csv_path, output_dir, workers=1, cache_dir=None, samples=0, target="gesamt",
+              refresh=False, seed=0, segmentation_engine=None):
+    features_path = os.path.join(output_dir, "merkmale.csv")
+    if refresh or not os.path.exists(features_path):
+        extract_dataset(source_dir, features_path, workers, cache_dir, segmentation_engine)
+    else:
+        print(f"[kalibrierung.py] Verwende vorhandene Merkmale aus {features_path}")
+
+    names, columns = load_features(features_path)
+    groups = frame_groups(names)
+    labels, soll = load_labels(groups[0], csv_path)
+
+    baseline = {k: np.array([v], dtype=np.float64) for k, v in current_parameters().items()}
+    base_scores, base_hits = search(columns, groups, labels, soll, baseline, target)
+
+    ranges = {name: grid_values(name, value) for name, value in current_parameters().items()}
+    if samples:
+        candidates = random_candidates(ranges, samples, seed)
+        mode = f"Zufallssuche ({samples} Kandidaten)"
+    else:
+        candidates = grid_candidates(ranges)
+        mode = f"Rastersuche ({len(next(iter(candidates.values())))} Kandidaten)"
+
+    print(f"[kalibrierung.py] {mode} auf {len(groups[0])} Bildern ({len(names)} Objekten), Ziel: {target}...")
+    scores, hits = search(columns, groups, labels, soll, candidates, target)
+    order = np.argsort(-scores, kind="stable")[:TOP_RESULTS]
+
+    report = {
+        "bilder": len(groups[0]),
+        "objekte": len(names),
+        "ziel": target,
+        "aktuell": describe({k: v[0] for k, v in baseline.items()}, base_hits[0], soll, base_scores[0]),
+        "beste": [describe({k: v[i] for k, v in candidates.items()}, hits[i], soll, scores[i]) for i in order],
+    }
+
+    result_path = os.path.join(output_dir, "ergebnis.json")
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    best = report["beste"][0]
+    print(f"   -> Aktuelle Schwellwerte: {report['aktuell']['genauigkeit']:.1f}%")
+    print(f"   -> Beste Kombination:     {best['genauigkeit']:.1f}%")
+    for name, value in best["parameter"].items():
+        marker = "" if value == report["aktuell"]["parameter"][name] else f"  (bisher {report['aktuell']['parameter'][name]})"
+        print(f"      {name:<26} = {value}{marker}")
+    print(f"   -> Details: {result_path}")
+    return report
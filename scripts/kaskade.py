@@ -0,0 +1,117 @@
+from scripts import bruch
+from scripts import farb
+from scripts import merkmale
+from scripts import metriken
+from scripts import rest
+from scripts import symmetrie
+
+PRIORITY = {"Normal": 0, "Farbfehler": 1, "Bruch": 2, "Rest": 3}
+ORDER = None
+LEGACY_ORDER = ["geometrie", "komplexitaet", "farbe"]
+
+
+def check_complexity(image, features, record, symmetry_engine):
+    with metriken.timer("rest", "compute"):
+        verdict, edge_sum, clean_edge_sum = rest.check_complexity(image, features)
+    metriken.record_branch("rest", verdict)
+    record["edge_sum"] = edge_sum
+
+    if verdict == "Fragment":
+        return "Rest", f"Fragment (Sum: {edge_sum} < {rest.MIN_EDGE_SUM})"
+    if verdict == "Chaos":
+        return "Rest", f"Chaos (Clean Sum: {clean_edge_sum})"
+    return None
+
+
+def check_geometry(image, features, record, symmetry_engine):
+    with metriken.timer("bruch", "compute"):
+        cat, reason = bruch.analyze_snack_geometry(image, features)
+    metriken.record_branch("bruch", reason)
+
+    if cat == "Normal":
+        record["reason"] = reason
+        return None
+    return (cat if cat == "Bruch" else "Rest"), reason
+
+
+def check_color(image, features, record, symmetry_engine):
+    with metriken.timer("farb", "compute"):
+        result = farb.detect_defects(image, spot_threshold=farb.SPOT_THRESHOLD, features=features)
+    metriken.record_branch("farb", "Farbfehler" if result["is_defective"] else "OK")
+    record["spot_area"] = result["spot_area"]
+
+    if result["is_defective"]:
+        record["contours"] = result["contours"]
+        return "Farbfehler", f"Farbfehler (Fläche {result['spot_area']:.0f})"
+    return None
+
+
+def score_symmetry(image, features, record, symmetry_engine):
+    with metriken.timer("symmetrie", "compute"):
+        record["symmetry"] = symmetrie.get_symmetry_score(image, symmetry_engine, features)
+
+
+CHECKS = {
+    "komplexitaet": {"cost": 0.7, "decides": ["Rest"], "features": rest.REQUIRED_FEATURES, "run": check_complexity},
+    "geometrie": {"cost": 1.8, "decides": ["Bruch", "Rest"], "features": bruch.REQUIRED_FEATURES, "run": check_geometry},
+    "farbe": {"cost": 2.5, "decides": ["Farbfehler"], "features": farb.REQUIRED_FEATURES, "run": check_color},
+}
+
+SCORES = {
+    "symmetrie": {"cost": 1.4, "applies_to": ["Normal"], "features": symmetrie.REQUIRED_FEATURES, "run": score_symmetry},
+}
+
+
+def check_order(order=None):
+    order = order or ORDER
+    if order:
+        return list(order)
+    return sorted(CHECKS, key=lambda name: CHECKS[name]["cost"])
+
+
+def required_features(order=None, scores=True):
+    names = []
+    entries = [CHECKS[name] for name in check_order(order)] + (list(SCORES.values()) if scores else [])
+    for entry in entries:
+        names.extend(name for name in entry["features"] if name not in names)
+    return names
+
+
+def can_override(name, category):
+    current = PRIORITY[category] if category else -1
+    return any(PRIORITY[c] > current for c in CHECKS[name]["decides"])
+
+
+def classify(image, symmetry_engine=None, features=None, order=None, scores=True):
+    record = {
+        "category": None,
+        "reason": None,
+        "edge_sum": None,
+        "spot_area": None,
+        "contours": [],
+        "symmetry": None,
+    }
+    features = merkmale.ensure(image, features)
+
+    pending = check_order(order)
+    while pending:
+        name = pending.pop(0)
+        if not can_override(name, record["category"]):
+            metriken.record_branch("kaskade", f"{name} übersprungen")
+            continue
+
+        verdict = CHECKS[name]["run"](image, features, record, symmetry_engine)
+        if verdict is not None:
+            record["category"], record["reason"] = verdict
+            if record["category"] != "Farbfehler":
+                record["contours"] = []
+
+    if record["category"] is None:
+        record["category"] = "Normal"
+        record["reason"] = record["reason"] or "OK"
+
+    for score in SCORES.values() if scores else []:
+        if record["category"] in score["applies_to"]:
+            score["run"](image, features, record, symmetry_engine)
+
+    return record
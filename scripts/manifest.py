@@ -0,0 +1,144 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+MANIFEST_FILE = "manifest.sqlite"
+WRITE_BATCH = 1000
+FIELDS = [
+    "datei", "quelle", "bild", "objekt", "position", "klasse", "grund", "stufe",
+    "symmetrie", "fleckflaeche", "kantensumme", "pfad",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urteile (
+    datei TEXT PRIMARY KEY,
+    quelle TEXT,
+    bild TEXT,
+    objekt INTEGER,
+    position TEXT,
+    klasse TEXT,
+    grund TEXT,
+    stufe TEXT,
+    symmetrie REAL,
+    fleckflaeche REAL,
+    kantensumme REAL,
+    pfad TEXT
+)
+"""
+
+
+def path_for(sorted_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(sorted_dir)), MANIFEST_FILE)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def reset(path):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    connect(path).close()
+
+
+def write(path, rows):
+    if not rows:
+        return
+
+    by_columns = {}
+    for row in rows:
+        unknown = set(row) - set(FIELDS)
+        if unknown or "datei" not in row:
+            raise ValueError(f"Ungültige Manifest-Zeile: {row}")
+        by_columns.setdefault(tuple(sorted(row)), []).append(row)
+
+    conn = connect(path)
+    try:
+        with conn:
+            for columns, group in by_columns.items():
+                updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "datei")
+                sql = (
+                    f"INSERT INTO urteile ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT(datei) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+                )
+                conn.executemany(sql, [tuple(row[c] for c in columns) for row in group])
+    finally:
+        conn.close()
+
+
+@contextmanager
+def writer(path, batch=WRITE_BATCH):
+    if path is None:
+        yield lambda row: None
+        return
+
+    rows = []
+
+    def add(row):
+        rows.append(row)
+        if len(rows) >= batch:
+            write(path, rows)
+            rows.clear()
+
+    try:
+        yield add
+    finally:
+        write(path, rows)
+
+
+def iter_rows(path, batch=WRITE_BATCH):
+    last = ""
+    while True:
+        conn = connect(path)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM urteile WHERE datei > ? ORDER BY datei LIMIT ?", (last, batch)
+            )
+            rows = [dict(zip(FIELDS, values)) for values in cursor]
+        finally:
+            conn.close()
+        yield from rows
+        if len(rows) < batch:
+            return
+        last = rows[-1]["datei"]
+
+
+def summary(path):
+    conn = connect(path)
+    try:
+        frames, objects = conn.execute("SELECT COUNT(DISTINCT COALESCE(bild, datei)), COUNT(*) FROM urteile").fetchone()
+        classes = dict(conn.execute("SELECT klasse, COUNT(*) FROM urteile WHERE klasse IS NOT NULL GROUP BY klasse ORDER BY klasse"))
+        return frames, objects, classes
+    finally:
+        conn.close()
+
+
+def read(path):
+    conn = connect(path)
+    try:
+        cursor = conn.execute(f"SELECT {', '.join(FIELDS)} FROM urteile ORDER BY datei")
+        return [dict(zip(FIELDS, values)) for values in cursor]
+    finally:
+        conn.close()
+
+
+def record_row(record, stage, path=None):
+    return {
+        "datei": record["name"],
+        "quelle": record.get("source"),
+        "bild": record.get("frame", record["name"]),
+        "objekt": record.get("object", 1),
+        "position": ",".join(str(v) for v in record["position"]) if record.get("position") else None,
+        "klasse": record["category"],
+        "grund": record["reason"],
+        "stufe": stage,
+        "symmetrie": record.get("symmetry"),
+        "fleckflaeche": record.get("spot_area"),
+        "kantensumme": record.get("edge_sum"),
+        "pfad": path,
+    }
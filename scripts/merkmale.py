@@ -0,0 +1,65 @@
+import cv2
+
+FEATURES = {}
+
+
+def feature(name):
+    def register(func):
+        FEATURES[name] = func
+        return func
+    return register
+
+
+def for_image(image):
+    return {"bild": image}
+
+
+def ensure(image, features=None):
+    return features if features is not None else for_image(image)
+
+
+def get(features, name):
+    if name not in features:
+        features[name] = FEATURES[name](features)
+    return features[name]
+
+
+def prepare(features, names):
+    for name in names:
+        get(features, name)
+    return features
+
+
+@feature("grau")
+def gray(features):
+    image = features["bild"]
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+@feature("hsv")
+def hsv(features):
+    return cv2.cvtColor(features["bild"], cv2.COLOR_BGR2HSV)
+
+
+@feature("maske_1")
+def mask_1(features):
+    _, mask = cv2.threshold(get(features, "grau"), 1, 255, cv2.THRESH_BINARY)
+    return mask
+
+
+@feature("maske_10")
+def mask_10(features):
+    _, mask = cv2.threshold(get(features, "grau"), 10, 255, cv2.THRESH_BINARY)
+    return mask
+
+
+@feature("pixel_10")
+def pixels_10(features):
+    return cv2.countNonZero(get(features, "maske_10"))
+
+
+@feature("momente_10")
+def moments_10(features):
+    return cv2.moments(get(features, "maske_10"))
@@ -0,0 +1,213 @@
+import csv
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ENABLED = False
+PROMETHEUS_PREFIX = "snack"
+
+_timings = {}
+_branches = {}
+_images = {}
+_started = time.perf_counter()
+_lock = threading.Lock()
+
+
+def enable(enabled=True):
+    global ENABLED, _started
+    ENABLED = enabled
+    _started = time.perf_counter()
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _branches.clear()
+        _images.clear()
+
+
+def add_timing(stage, phase, seconds, count=1, peak=None):
+    with _lock:
+        entry = _timings.setdefault((stage, phase), [0, 0.0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds if peak is None else peak)
+
+
+@contextmanager
+def timer(stage, phase):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(stage, phase, time.perf_counter() - start)
+
+
+def branch_name(reason):
+    return re.split(r"[\d(]", str(reason), maxsplit=1)[0].strip(" :") or str(reason)
+
+
+def record_branch(stage, reason, count=1):
+    if ENABLED:
+        key = (stage, branch_name(reason))
+        with _lock:
+            _branches[key] = _branches.get(key, 0) + count
+
+
+def count_image(stage, count=1):
+    if ENABLED:
+        with _lock:
+            _images[stage] = _images.get(stage, 0) + count
+
+
+def drain():
+    with _lock:
+        state = {"timings": dict(_timings), "branches": dict(_branches), "images": dict(_images)}
+        _timings.clear()
+        _branches.clear()
+        _images.clear()
+    return state
+
+
+def merge(state):
+    for (stage, phase), (count, total, peak) in state["timings"].items():
+        add_timing(stage, phase, total, count, peak)
+    with _lock:
+        for key, count in state["branches"].items():
+            _branches[key] = _branches.get(key, 0) + count
+        for stage, count in state["images"].items():
+            _images[stage] = _images.get(stage, 0) + count
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return {}
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def summary():
+    stages = {}
+    for (stage, phase), (count, total, peak) in sorted(_timings.items()):
+        stages.setdefault(stage, {"images": _images.get(stage, 0), "phases": {}, "branches": {}})
+        stages[stage]["phases"][phase] = {
+            "count": count,
+            "total_s": round(total, 6),
+            "mean_ms": round(total / count * 1000, 3) if count else 0,
+            "max_ms": round(peak * 1000, 3),
+        }
+    for (stage, branch), count in sorted(_branches.items()):
+        stages.setdefault(stage, {"images": _images.get(stage, 0), "phases": {}, "branches": {}})
+        stages[stage]["branches"][branch] = count
+
+    for stage, data in stages.items():
+        wall = data["phases"].get("gesamt", {}).get("total_s")
+        data["images_per_sec"] = round(data["images"] / wall, 2) if wall else None
+
+    return {
+        "wall_s": round(time.perf_counter() - _started, 3),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": stages,
+    }
+
+
+def write_json(path, data=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data or summary(), f, indent=2, ensure_ascii=False)
+
+
+def write_csv(path, data=None):
+    data = data or summary()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["typ", "stufe", "name", "anzahl", "gesamt_s", "mittel_ms", "max_ms"])
+        for stage, info in data["stages"].items():
+            for phase, t in info["phases"].items():
+                writer.writerow(["zeit", stage, phase, t["count"], t["total_s"], t["mean_ms"], t["max_ms"]])
+            for branch, count in info["branches"].items():
+                writer.writerow(["zweig", stage, branch, count, "", "", ""])
+            writer.writerow(["bilder", stage, "bilder_pro_s", info["images"], "", info["images_per_sec"] or "", ""])
+        for process, rss in data["peak_rss_bytes"].items():
+            writer.writerow(["speicher", process, "peak_rss_bytes", rss, "", "", ""])
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus(path, data=None):
+    data = data or summary()
+    p = PROMETHEUS_PREFIX
+    lines = [
+        f"# HELP {p}_stage_seconds_total Summierte Laufzeit pro Stufe und Phase.",
+        f"# TYPE {p}_stage_seconds_total counter",
+    ]
+    for stage, info in data["stages"].items():
+        for phase, t in info["phases"].items():
+            lines.append(f'{p}_stage_seconds_total{{stage="{_label(stage)}",phase="{_label(phase)}"}} {t["total_s"]}')
+    lines += [f"# HELP {p}_stage_calls_total Anzahl Messungen pro Stufe und Phase.", f"# TYPE {p}_stage_calls_total counter"]
+    for stage, info in data["stages"].items():
+        for phase, t in info["phases"].items():
+            lines.append(f'{p}_stage_calls_total{{stage="{_label(stage)}",phase="{_label(phase)}"}} {t["count"]}')
+    lines += [f"# HELP {p}_branch_total Anzahl getroffener Entscheidungszweige.", f"# TYPE {p}_branch_total counter"]
+    for stage, info in data["stages"].items():
+        for branch, count in info["branches"].items():
+            lines.append(f'{p}_branch_total{{stage="{_label(stage)}",branch="{_label(branch)}"}} {count}')
+    lines += [f"# HELP {p}_images_total Verarbeitete Bilder pro Stufe.", f"# TYPE {p}_images_total counter"]
+    for stage, info in data["stages"].items():
+        lines.append(f'{p}_images_total{{stage="{_label(stage)}"}} {info["images"]}')
+    lines += [f"# HELP {p}_peak_rss_bytes Maximaler Arbeitsspeicher.", f"# TYPE {p}_peak_rss_bytes gauge"]
+    for process, rss in data["peak_rss_bytes"].items():
+        lines.append(f'{p}_peak_rss_bytes{{process="{process}"}} {rss}')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def export(path, prometheus_path=None):
+    data = summary()
+    if path:
+        if path.lower().endswith(".csv"):
+            write_csv(path, data)
+        else:
+            write_json(path, data)
+        print(f"[metriken.py] Metriken in {path} geschrieben.")
+    if prometheus_path:
+        write_prometheus(prometheus_path, data)
+        print(f"[metriken.py] Prometheus-Text in {prometheus_path} geschrieben.")
+    return data
+
+
+def print_summary(data=None):
+    data = data or summary()
+    print("\n" + "=" * 65)
+    print("   METRIKEN PRO STUFE")
+    print("=" * 65)
+    for stage, info in data["stages"].items():
+        line = f"{stage:<15}"
+        if info["images"]:
+            line += f" | {info['images']:>6} Bilder"
+        if info["images_per_sec"]:
+            line += f" | {info['images_per_sec']:.1f} Bilder/s"
+        print(line)
+        for phase, t in info["phases"].items():
+            print(f"   {phase:<12} {t['total_s']:9.3f} s | {t['mean_ms']:8.2f} ms/Aufruf")
+        for branch, count in sorted(info["branches"].items(), key=lambda x: -x[1]):
+            print(f"   -> {branch:<40} {count:>6}")
+    for process, rss in data["peak_rss_bytes"].items():
+        print(f"Peak RSS ({process}): {rss / 1024 ** 2:.1f} MB")
+    print("=" * 65)
@@ -0,0 +1,61 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from scripts import metriken
+
+MAX_PENDING_PER_WORKER = 4
+
+
+def opencv_threads_per_worker(workers):
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_worker(cv_threads, collect_metrics):
+    cv2.setNumThreads(cv_threads)
+    metriken.reset()
+    metriken.enable(collect_metrics)
+
+
+def _call_with_metrics(func, item):
+    result = func(item)
+    return result, metriken.drain()
+
+
+def create_pool(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(opencv_threads_per_worker(workers), metriken.ENABLED),
+    )
+
+
+def submit(executor, func, item):
+    return executor.submit(_call_with_metrics, func, item)
+
+
+def collect(future):
+    result, state = future.result()
+    metriken.merge(state)
+    return result
+
+
+def imap(func, items, workers=1):
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_pending = workers * MAX_PENDING_PER_WORKER
+
+    with create_pool(workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(submit(executor, func, item))
+            if len(pending) >= max_pending:
+                yield collect(pending.popleft())
+
+        while pending:
+            yield collect(pending.popleft())
@@ -0,0 +1,348 @@
+import csv
+import os
+import shutil
+import cv2
+import numpy as np
+from functools import partial
+
+from scripts import cache
+from scripts import dateien
+from scripts import kaskade
+from scripts import manifest
+from scripts import metriken
+from scripts import segmentierung
+from scripts import speicher
+from scripts import stapel
+from scripts import bruch
+from scripts import farb
+from scripts import symmetrie
+from scripts import parallel
+from scripts import verteilung
+
+CLASSES = ["Normal", "Bruch", "Rest", "Farbfehler"]
+LOSSLESS_EXTENSIONS = ('.png',)
+REPRODUCE_INTERMEDIATE_CODEC = True
+STORE_RESULTS_FILE = "ergebnisse.csv"
+
+CACHE_MODULES = [
+    "scripts.pipeline",
+    "scripts.segmentierung",
+    "scripts.bruch",
+    "scripts.gleitfenster",
+    "scripts.kaskade",
+    "scripts.merkmale",
+    "scripts.rest",
+    "scripts.farb",
+    "scripts.symmetrie",
+]
+
+
+def classify_image(image, symmetry_engine=None, features=None):
+    return kaskade.classify(image, symmetry_engine, features)
+
+
+def encode_output(record, image, encoded, ext):
+    if record["category"] == "Farbfehler":
+        _, encoded = cv2.imencode(ext, farb.annotate_defects(image.copy(), record["contours"]))
+    return encoded
+
+
+def cache_key(data, ext, symmetry_engine, segmentation_engine=None):
+    extra = {
+        "ext": ext,
+        "symmetry_engine": symmetry_engine or symmetrie.SYMMETRY_ENGINE,
+        "segmentation_engine": segmentation_engine or segmentierung.SEGMENTATION_ENGINE,
+    }
+    return cache.stage_key("pipeline", data, CACHE_MODULES, extra)
+
+
+def records_from_cache(meta, payload):
+    records = []
+    start = 0
+    for entry in meta["records"]:
+        record = dict(entry)
+        record["contours"] = [np.array(cnt, dtype=np.int32) for cnt in record["contours"]]
+        length = record.pop("length")
+        record["output"] = payload[start: start + length]
+        start += length
+        records.append(record)
+    return records
+
+
+def store_records(cache_dir, key, records):
+    if not cache_dir:
+        return
+    entries = []
+    for record in records:
+        meta = {k: v for k, v in record.items() if k not in ("source", "name", "frame", "output")}
+        meta["contours"] = [cnt.tolist() for cnt in record["contours"]]
+        meta["length"] = len(record["output"])
+        entries.append(meta)
+    payload = np.concatenate([record["output"].ravel() for record in records]) if records else None
+    cache.store(cache_dir, key, {"records": entries}, payload)
+
+
+def load_file(full_path, name, symmetry_engine=None, cache_dir=None, segmentation_engine=None):
+    ext = os.path.splitext(name)[1].lower()
+
+    try:
+        with metriken.timer("pipeline", "lesen"):
+            data = cache.read_bytes(full_path)
+    except OSError:
+        return None
+
+    metriken.count_image("pipeline")
+    key = cache_key(data, ext, symmetry_engine, segmentation_engine) if cache_dir else None
+    frame = {"source": full_path, "name": name, "ext": ext, "key": key}
+
+    cached = cache.load(cache_dir, key)
+    if cached is not None:
+        frame["records"] = records_from_cache(*cached)
+        return frame
+
+    with metriken.timer("pipeline", "decode"):
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+
+    frame["items"] = frame_items(image, ext, segmentation_engine=segmentation_engine)
+    if not frame["items"]:
+        store_records(cache_dir, key, [])
+    return frame
+
+
+def frame_items(image, ext, encode=True, segmentation_engine=None):
+    res = []
+    with metriken.timer("segmentierung", "compute"):
+        has_result = segmentierung.run_preprocessing(image, res, segmentation_engine)
+    if not has_result:
+        metriken.record_branch("pipeline", "Kein Objekt")
+        return []
+
+    results = [entry for entry in res if entry["name"] == "Result"]
+    items = []
+    for i, entry in enumerate(results):
+        warped = entry["data"]
+        encoded = None
+        if encode:
+            with metriken.timer("pipeline", "encode"):
+                ok, encoded = cv2.imencode(ext, warped)
+                if ok and REPRODUCE_INTERMEDIATE_CODEC and ext not in LOSSLESS_EXTENSIONS:
+                    warped = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+            if not ok:
+                continue
+
+        items.append({
+            "image": warped,
+            "encoded": encoded,
+            "ext": ext,
+            "object": i + 1,
+            "position": entry["position"],
+        })
+    return items
+
+
+def finish_file(item, symmetry_engine=None, features=None):
+    record = classify_image(item["image"], symmetry_engine, features)
+    with metriken.timer("pipeline", "encode"):
+        record["output"] = encode_output(record, item["image"], item["encoded"], item["ext"])
+    record["object"] = item["object"]
+    record["position"] = item["position"]
+    return record
+
+
+def finish_frame(frame, symmetry_engine=None, cache_dir=None, features=None):
+    if frame is None:
+        return []
+
+    records = frame.get("records")
+    if records is None:
+        features = features or [None] * len(frame["items"])
+        records = [finish_file(item, symmetry_engine, f) for item, f in zip(frame["items"], features)]
+        store_records(cache_dir, frame["key"], records)
+
+    for record in records:
+        metriken.record_branch("pipeline", record["category"])
+        record["source"] = frame["source"]
+        record["frame"] = frame["name"]
+        record["name"] = segmentierung.object_name(frame["name"], record["object"] - 1, len(records))
+    return records
+
+
+def process_file(full_path, name, symmetry_engine=None, cache_dir=None, segmentation_engine=None):
+    frame = load_file(full_path, name, symmetry_engine, cache_dir, segmentation_engine)
+    return finish_frame(frame, symmetry_engine, cache_dir)
+
+
+def process_job(job, symmetry_engine=None, cache_dir=None, segmentation_engine=None):
+    full_path, name = job
+    return process_file(full_path, name, symmetry_engine, cache_dir, segmentation_engine)
+
+
+def process_batch(jobs, symmetry_engine=None, cache_dir=None, segmentation_engine=None):
+    frames = [load_file(full_path, name, symmetry_engine, cache_dir, segmentation_engine) for full_path, name in jobs]
+
+    pending = [item for frame in frames if frame is not None and "items" in frame for item in frame["items"]]
+    with metriken.timer("stapel", "compute"):
+        features = stapel.batch_features([item["image"] for item in pending], kaskade.required_features())
+    for item, item_features in zip(pending, features):
+        item["features"] = item_features
+
+    return [
+        finish_frame(
+            frame, symmetry_engine, cache_dir,
+            [item["features"] for item in frame["items"]] if frame is not None and "items" in frame else None,
+        )
+        for frame in frames
+    ]
+
+
+def write_record(record, target_dir):
+    cat = record["category"]
+    name = record["name"]
+
+    if cat == "Normal" and record["symmetry"] is not None:
+        name = symmetrie.scored_filename(record["symmetry"], name)
+
+    target_path = os.path.join(target_dir, cat, name)
+    if cat == "Rest" and record["reason"].startswith("Chaos") and os.path.exists(target_path):
+        base, ext = os.path.splitext(name)
+        target_path = os.path.join(target_dir, cat, f"{base}_complex{ext}")
+
+    record["output"].tofile(target_path)
+    return target_path
+
+
+def iter_source_files(source_dir):
+    for root, file_name in dateien.scan_images(source_dir):
+        name = bruch.sorted_name(root, source_dir, file_name)
+        if verteilung.in_shard(name):
+            yield os.path.join(root, file_name), name
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_records(source_dir, workers=1, symmetry_engine=None, cache_dir=None, batch_size=1, segmentation_engine=None):
+    jobs = iter_source_files(source_dir)
+    engines = {"symmetry_engine": symmetry_engine, "segmentation_engine": segmentation_engine}
+    if batch_size <= 1:
+        for records in parallel.imap(partial(process_job, cache_dir=cache_dir, **engines), jobs, workers):
+            yield from records
+        return
+
+    for frames in parallel.imap(
+        partial(process_batch, cache_dir=cache_dir, **engines),
+        batched(jobs, batch_size),
+        workers,
+    ):
+        for records in frames:
+            yield from records
+
+
+def sort_records(records, target_dir=None, manifest_path=None):
+    if target_dir:
+        shutil.rmtree(target_dir, ignore_errors=True)
+        for c in CLASSES:
+            os.makedirs(os.path.join(target_dir, c), exist_ok=True)
+
+    stats = {k: 0 for k in CLASSES}
+    score_sum = 0.0
+
+    if manifest_path:
+        manifest.reset(manifest_path)
+
+    with manifest.writer(manifest_path) as verdict:
+        for record in records:
+            if record is None:
+                continue
+
+            name = record["name"]
+            target_path = None
+            if target_dir:
+                with metriken.timer("pipeline", "schreiben"):
+                    target_path = write_record(record, target_dir)
+            stats[record["category"]] += 1
+            verdict(manifest.record_row(record, "pipeline", target_path))
+
+            if record["category"] != "Normal":
+                print(f"   [{record['category']}] {name} -> {record['reason']}")
+            else:
+                score_sum += record["symmetry"]
+
+    avg_score = score_sum / stats["Normal"] if stats["Normal"] else 0
+    print(f"[pipeline.py] Fertig: {stats}")
+    print(f"   -> Durchschnittlicher Symmetrie-Score: {avg_score:.2f}")
+
+    return sum(stats.values())
+
+
+def run_pipeline(source_dir, target_dir, workers=1, symmetry_engine=None, cache_dir=None, batch_size=1,
+                 segmentation_engine=None):
+    print(f"\n[pipeline.py] Starte In-Memory-Pipeline von {source_dir} nach {target_dir}...")
+    return sort_records(
+        iter_records(source_dir, workers, symmetry_engine, cache_dir, batch_size, segmentation_engine),
+        target_dir,
+        manifest.path_for(target_dir),
+    )
+
+
+def process_row(job, symmetry_engine=None, export=True):
+    store_dir, row = job
+    entry = speicher.rows(store_dir)[row]
+    image = speicher.image(store_dir, row)
+
+    metriken.count_image("pipeline")
+    record = classify_image(image, symmetry_engine)
+
+    if export:
+        ext = os.path.splitext(entry["name"])[1].lower()
+        with metriken.timer("pipeline", "encode"):
+            encoded = None if record["category"] == "Farbfehler" else cv2.imencode(ext, image)[1]
+            record["output"] = encode_output(record, image, encoded, ext)
+
+    metriken.record_branch("pipeline", record["category"])
+    record["source"] = entry["source"]
+    record["name"] = entry["name"]
+    record["frame"] = entry.get("frame", entry["name"])
+    record["object"] = entry.get("object", 1)
+    record["position"] = entry.get("position")
+    return record
+
+
+def iter_store_records(store_dir, results_path, workers=1, symmetry_engine=None, export=True):
+    count = len(speicher.rows(store_dir))
+    with open(results_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["bild", "datei", "objekt", "position", "klasse", "grund", "symmetrie"])
+        for record in parallel.imap(
+            partial(process_row, symmetry_engine=symmetry_engine, export=export),
+            ((store_dir, row) for row in range(count)),
+            workers,
+        ):
+            position = ",".join(str(v) for v in record["position"]) if record["position"] else ""
+            writer.writerow([
+                record["source"], record["name"], record["object"], position,
+                record["category"], record["reason"], record["symmetry"],
+            ])
+            yield record
+
+
+def run_store_pipeline(store_dir, target_dir, workers=1, symmetry_engine=None, export=True):
+    results_path = os.path.join(store_dir, STORE_RESULTS_FILE)
+    print(f"\n[pipeline.py] Prüfe Bilder aus Speicher {store_dir}...")
+    count = sort_records(
+        iter_store_records(store_dir, results_path, workers, symmetry_engine, export),
+        target_dir if export else None,
+        manifest.path_for(target_dir),
+    )
+    print(f"   -> Urteile: {results_path}")
+    return count
@@ -0,0 +1,72 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from scripts import parallel
+
+READ_THREADS = 4
+PREFETCH_DEPTH = 8
+WRITE_THREADS = 2
+WRITE_QUEUE = 16
+
+
+def configure(threads):
+    global READ_THREADS, WRITE_THREADS
+    READ_THREADS = max(0, threads)
+    WRITE_THREADS = max(0, threads // 2 if threads > 1 else threads)
+
+
+def prefetch(func, items, depth=None, threads=None):
+    depth = PREFETCH_DEPTH if depth is None else depth
+    threads = READ_THREADS if threads is None else threads
+    if threads <= 0 or depth <= 0:
+        for item in items:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _load_and_run(load, func, item):
+    return func(load(item))
+
+
+def imap(load, func, items, workers=1):
+    if workers > 1:
+        return parallel.imap(partial(_load_and_run, load, func), items, workers)
+    return (func(loaded) for loaded in prefetch(load, items))
+
+
+def _run_now(func, *args):
+    func(*args)
+
+
+@contextmanager
+def write_back(threads=None, depth=None):
+    threads = WRITE_THREADS if threads is None else threads
+    depth = WRITE_QUEUE if depth is None else depth
+    if threads <= 0:
+        yield _run_now
+        return
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+
+        def submit(func, *args):
+            pending.append(executor.submit(func, *args))
+            while pending and (len(pending) > depth or pending[0].done()):
+                pending.popleft().result()
+
+        yield submit
+
+        while pending:
+            pending.popleft().result()
@@ -1,33 +1,33 @@
 import cv2
+import itertools
 import numpy as np
 import os
 import shutil
 
+from scripts import dateien
+from scripts import manifest
+from scripts import merkmale
+from scripts import metriken
+from scripts import puffer
+
 MAX_EDGE_SUM = 3031
 MIN_EDGE_SUM = 2740
 MIN_OBJECT_AREA = 250
+REQUIRED_FEATURES = ["maske_1"]
 
 
 def remove_small_artifacts(binary_img, min_area):
     num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary_img, connectivity=8)
 
-    clean_binary = np.zeros_like(binary_img)
-
-    for i in range(1, num_labels):
-        area = stats[i, cv2.CC_STAT_AREA]
-        if area >= min_area:
-            clean_binary[labels == i] = 255
-
-    return clean_binary
+    lut = np.where(stats[:, cv2.CC_STAT_AREA] >= min_area, 255, 0).astype(binary_img.dtype)
+    lut[0] = 0
 
+    return lut[labels]
 
-def calculate_edge_sum(image):
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
 
-    _, binary = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+def calculate_edge_sum(image, features=None):
+    features = merkmale.ensure(image, features)
+    binary = merkmale.get(features, "maske_1")
 
     kernel = np.ones((2, 2), np.uint8)
     binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
@@ -39,7 +39,47 @@ def calculate_edge_sum(image):
     return total_edge_length, edges, binary
 
 
-def run_complexity_check(sorted_dir):
+def check_complexity(image, features=None):
+    edge_sum, _, binary_orig = calculate_edge_sum(image, features)
+
+    if edge_sum < MIN_EDGE_SUM:
+        return "Fragment", edge_sum, None
+
+    if edge_sum > MAX_EDGE_SUM:
+        binary_clean = remove_small_artifacts(binary_orig, MIN_OBJECT_AREA)
+
+        edges_clean = cv2.Canny(binary_clean, 50, 150)
+        clean_edge_sum = cv2.countNonZero(edges_clean)
+
+        if clean_edge_sum > MAX_EDGE_SUM:
+            return "Chaos", edge_sum, clean_edge_sum
+        return "Behalten", edge_sum, clean_edge_sum
+
+    return "OK", edge_sum, None
+
+
+def load_image(file_path):
+    with metriken.timer("rest", "decode"):
+        return cv2.imread(file_path)
+
+
+def check_loaded(image):
+    if image is None:
+        return None
+
+    metriken.count_image("rest")
+    with metriken.timer("rest", "compute"):
+        result = check_complexity(image)
+    metriken.record_branch("rest", result[0])
+    return result
+
+
+def move_file(file_path, target_path):
+    with metriken.timer("rest", "schreiben"):
+        shutil.move(file_path, target_path)
+
+
+def run_complexity_check(sorted_dir, workers=1):
     print("\n[rest.py] Starte Komplexitäts-Prüfung...")
     print(f"   - Limit: {MAX_EDGE_SUM} Kanten-Pixel")
     print(f"   - Artefakt-Filter: Objekte unter {MIN_OBJECT_AREA}px werden ignoriert")
@@ -50,46 +90,49 @@ def run_complexity_check(sorted_dir):
     check_classes = ["Normal", "Bruch"]
     moved_count = 0
     kept_count = 0
-
-    for cls in check_classes:
-        class_path = os.path.join(sorted_dir, cls)
-
-        for root, _, files in os.walk(class_path):
-            for file_name in files:
-                if not file_name.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    continue
-
-                file_path = os.path.join(root, file_name)
-                image = cv2.imread(file_path)
-                if image is None:
-                    continue
-
-                edge_sum, edges_orig, binary_orig = calculate_edge_sum(image)
-
-                if edge_sum < MIN_EDGE_SUM:
-                    target_path = os.path.join(rest_dir, file_name)
-                    shutil.move(file_path, target_path)
-                    moved_count += 1
-                    print(f"   -> REST (Fragment): {file_name} (Sum: {edge_sum} < {MIN_EDGE_SUM})")
-                    continue
-
-                if edge_sum > MAX_EDGE_SUM:
-                    binary_clean = remove_small_artifacts(binary_orig, MIN_OBJECT_AREA)
-
-                    edges_clean = cv2.Canny(binary_clean, 50, 150)
-                    clean_edge_sum = cv2.countNonZero(edges_clean)
-
-                    if clean_edge_sum > MAX_EDGE_SUM:
-                        target_path = os.path.join(rest_dir, file_name)
-                        if os.path.exists(target_path):
-                            base, ext = os.path.splitext(file_name)
-                            target_path = os.path.join(rest_dir, f"{base}_complex{ext}")
-
-                        shutil.move(file_path, target_path)
-                        moved_count += 1
-                        print(f"   -> REST (Chaos): {file_name} (Clean Sum: {clean_edge_sum})")
-                    else:
-                        kept_count += 1
-                        print(f"   -> BEHALTEN: {file_name} (Original: {edge_sum} -> Clean: {clean_edge_sum})")
+    claimed = set()
+
+    jobs = (
+        (os.path.join(root, file_name), file_name)
+        for cls in check_classes
+        for root, file_name in dateien.scan_images(os.path.join(sorted_dir, cls))
+    )
+    jobs, pending = itertools.tee(jobs)
+
+    results = puffer.imap(load_image, check_loaded, (file_path for file_path, _ in pending), workers)
+
+    with puffer.write_back() as write, manifest.writer(manifest.path_for(sorted_dir)) as record:
+        for (file_path, file_name), result in zip(jobs, results):
+            if result is None:
+                continue
+
+            verdict, edge_sum, clean_edge_sum = result
+            row = {"datei": file_name, "kantensumme": edge_sum}
+
+            if verdict == "Fragment":
+                target_path = os.path.join(rest_dir, file_name)
+                claimed.add(file_name)
+                write(move_file, file_path, target_path)
+                moved_count += 1
+                row.update(klasse="Rest", grund=f"Fragment (Sum: {edge_sum} < {MIN_EDGE_SUM})", stufe="rest", pfad=target_path)
+                print(f"   -> REST (Fragment): {file_name} (Sum: {edge_sum} < {MIN_EDGE_SUM})")
+            elif verdict == "Chaos":
+                # Noch ausstehende Verschiebungen sind auf der Platte nicht sichtbar; daher zusätzlich die vergebenen Namen merken.
+                target_name = file_name
+                if file_name in claimed or os.path.exists(os.path.join(rest_dir, file_name)):
+                    base, ext = os.path.splitext(file_name)
+                    target_name = f"{base}_complex{ext}"
+                claimed.add(target_name)
+                target_path = os.path.join(rest_dir, target_name)
+
+                write(move_file, file_path, target_path)
+                moved_count += 1
+                row.update(klasse="Rest", grund=f"Chaos (Clean Sum: {clean_edge_sum})", stufe="rest", pfad=target_path)
+                print(f"   -> REST (Chaos): {file_name} (Clean Sum: {clean_edge_sum})")
+            elif verdict == "Behalten":
+                kept_count += 1
+                print(f"   -> BEHALTEN: {file_name} (Original: {edge_sum} -> Clean: {clean_edge_sum})")
+
+            record(row)
 
     print(f"[rest.py] Fertig. {moved_count} verschoben. {kept_count} vor fälschlicher Verschiebung gerettet.")
@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+
+from scripts import kaskade
+from scripts import metriken
+from scripts import pipeline
+from scripts import stapel
+
+DEFAULT_EXT = ".jpg"
+
+
+def decode(data):
+    if isinstance(data, np.ndarray) and data.ndim == 3:
+        return data
+    buffer = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+    with metriken.timer("schnittstelle", "decode"):
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+    if image is None:
+        raise ValueError("Bild kann nicht dekodiert werden")
+    return image
+
+
+def supports_ext(ext):
+    return cv2.haveImageWriter(f"bild{ext}")
+
+
+def prepare(data, ext=DEFAULT_EXT, segmented=False, segmentation_engine=None):
+    if not supports_ext(ext):
+        raise ValueError(f"Format {ext} wird nicht unterstützt")
+    image = decode(data)
+    if segmented:
+        return [{"image": image, "object": 1, "position": None}]
+    encode = pipeline.REPRODUCE_INTERMEDIATE_CODEC and ext not in pipeline.LOSSLESS_EXTENSIONS
+    return pipeline.frame_items(image, ext, encode=encode, segmentation_engine=segmentation_engine)
+
+
+def verdict(record):
+    return {
+        "objekt": record["object"],
+        "position": list(record["position"]) if record["position"] else None,
+        "klasse": record["category"],
+        "grund": record["reason"],
+        "symmetrie": record["symmetry"],
+        "fleckflaeche": record["spot_area"],
+        "kantensumme": record["edge_sum"],
+        "konturen": [cnt.reshape(-1, 2).tolist() for cnt in record["contours"]],
+    }
+
+
+def classify_item(item, symmetry_engine=None):
+    with metriken.timer("schnittstelle", "compute"):
+        record = pipeline.classify_image(item["image"], symmetry_engine, item["features"])
+    metriken.record_branch("schnittstelle", record["category"])
+    record["object"] = item["object"]
+    record["position"] = item["position"]
+    return verdict(record)
+
+
+def classify_batch(requests, symmetry_engine=None, segmentation_engine=None):
+    frames = []
+    for data, ext, segmented in requests:
+        metriken.count_image("schnittstelle")
+        try:
+            frames.append(prepare(data, ext or DEFAULT_EXT, segmented, segmentation_engine))
+        except (ValueError, cv2.error) as e:
+            frames.append(e)
+
+    pending = [item for frame in frames if isinstance(frame, list) for item in frame]
+    with metriken.timer("stapel", "compute"):
+        features = stapel.batch_features([item["image"] for item in pending], kaskade.required_features())
+    for item, item_features in zip(pending, features):
+        item["features"] = item_features
+
+    results = []
+    for frame in frames:
+        if isinstance(frame, Exception):
+            results.append({"fehler": str(frame)})
+            continue
+
+        # Ein fehlerhaftes Bild darf die übrigen Anfragen im Stapel nicht mitreißen.
+        try:
+            results.append({"objekte": [classify_item(item, symmetry_engine) for item in frame]})
+        except (ValueError, cv2.error) as e:
+            metriken.record_branch("schnittstelle", "Fehler")
+            results.append({"fehler": str(e)})
+    return results
+
+
+def classify(data, ext=DEFAULT_EXT, segmented=False, symmetry_engine=None, segmentation_engine=None):
+    result = classify_batch([(data, ext, segmented)], symmetry_engine, segmentation_engine)[0]
+    if "fehler" in result:
+        raise ValueError(result["fehler"])
+    return result["objekte"]
@@ -1,86 +1,363 @@
 import cv2
+import itertools
 import numpy as np
 import os
 import shutil
+from functools import partial
 
+from scripts import bruch
+from scripts import cache
+from scripts import dateien
+from scripts import manifest
+from scripts import metriken
+from scripts import puffer
+from scripts import speicher
+from scripts import verteilung
 
-def run_preprocessing(image, result):
+CACHE_MODULES = ["scripts.segmentierung"]
+
+SEGMENTATION_ENGINE = "classic"
+GREEN_LOWER = np.array([35, 40, 30])
+GREEN_UPPER = np.array([85, 255, 255])
+MIN_OBJECT_AREA = 30000
+WARP_SIZE = (600, 400)
+TARGET_SIZE = (400, 400)
+DETECT_MAX_SIDE = 640
+CANDIDATE_AREA_RATIO = 0.8
+REFINE_PADDING = 4
+
+
+def box_points(contour):
+    rect = cv2.minAreaRect(contour)
+
+    if rect[1][1] > rect[1][0]:
+        rect = (rect[0], (rect[1][1], rect[1][0]), rect[2] - 90)
+
+    return np.int64(cv2.boxPoints(rect))
+
+
+def object_position(contour):
+    (cx, cy), _ = cv2.minEnclosingCircle(contour)
+    return [int(round(cx)), int(round(cy))]
+
+
+def reading_order(contours):
+    rows = []
+    for contour in sorted(contours, key=lambda c: cv2.boundingRect(c)[1]):
+        x, y, w, h = cv2.boundingRect(contour)
+        if rows and y < rows[-1]["top"] + rows[-1]["height"] / 2:
+            rows[-1]["items"].append((x, contour))
+        else:
+            rows.append({"top": y, "height": h, "items": [(x, contour)]})
+    return [contour for row in rows for _, contour in sorted(row["items"], key=lambda item: item[0])]
+
+
+def object_name(name, index, count):
+    if count == 1:
+        return name
+    base, ext = os.path.splitext(name)
+    return f"{base}_{index + 1:02d}{ext}"
+
+
+def warp_target_points(size):
+    return np.array([[0, size[1] - 1], [0, 0], [size[0] - 1, 0], [size[0] - 1, size[1] - 1]], dtype="float32")
+
+
+def preprocess_classic(image, result):
     image_copy = image.copy()
     image_work = image.copy()
 
     hsv = cv2.cvtColor(image_copy, cv2.COLOR_BGR2HSV)
 
-    lower_green = np.array([35, 40, 30])
-    upper_green = np.array([85, 255, 255])
-
-    mask_green = cv2.inRange(hsv, lower_green, upper_green)
+    mask_green = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER)
     mask_object = cv2.bitwise_not(mask_green)
 
     image_work = cv2.bitwise_and(image_work, image_work, mask=mask_object)
 
     _, thresh = cv2.threshold(cv2.cvtColor(image_work, cv2.COLOR_BGR2GRAY), 10, 255, cv2.THRESH_BINARY)
-    contours, _ = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+    contours, hierarchy = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+    top_level = [ele for ele, h in zip(contours, hierarchy[0] if hierarchy is not None else []) if h[3] < 0]
 
     processed = False
-    for ele in contours:
-        if cv2.contourArea(ele) > 30000:
-            rect = cv2.minAreaRect(ele)
-
-            if rect[1][1] > rect[1][0]:
-                rect = (rect[0], (rect[1][1], rect[1][0]), rect[2] - 90)
-
-            boxf = cv2.boxPoints(rect)
-            boxf = np.int64(boxf)
+    for ele in reading_order(top_level):
+        if cv2.contourArea(ele) > MIN_OBJECT_AREA:
+            boxf = box_points(ele)
 
             mask = np.zeros((image_copy.shape[0], image_copy.shape[1])).astype(np.uint8)
             cv2.drawContours(mask, [ele], -1, (255), cv2.FILLED)
 
-            image_work[mask == 0] = (0, 0, 0)
+            image_object = image_work.copy()
+            image_object[mask == 0] = (0, 0, 0)
+
+            M = cv2.getPerspectiveTransform(boxf.astype("float32"), warp_target_points(WARP_SIZE))
 
-            target_w, target_h = 400, 400
+            warped = cv2.warpPerspective(image_object, M, WARP_SIZE, cv2.INTER_CUBIC)
+            warped = cv2.resize(warped, TARGET_SIZE, interpolation=cv2.INTER_CUBIC)
 
-            size_warp = (600, 400)
-            dst_pts = np.array([[0, size_warp[1] - 1], [0, 0], [size_warp[0] - 1, 0], [size_warp[0] - 1, size_warp[1] - 1]], dtype="float32")
+            result.append({"name": "Result", "data": warped, "position": object_position(ele)})
+            processed = True
 
-            M = cv2.getPerspectiveTransform(boxf.astype("float32"), dst_pts)
+    return processed
 
-            warped = cv2.warpPerspective(image_work, M, (size_warp[0], size_warp[1]), cv2.INTER_CUBIC)
-            warped = cv2.resize(warped, (target_w, target_h), interpolation=cv2.INTER_CUBIC)
 
-            result.append({"name": "Result", "data": warped})
-            processed = True
+def not_green(image):
+    return cv2.bitwise_not(cv2.inRange(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), GREEN_LOWER, GREEN_UPPER))
+
+
+def object_mask(image):
+    _, bright = cv2.threshold(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 10, 255, cv2.THRESH_BINARY)
+    return cv2.bitwise_and(bright, not_green(image))
+
+
+def padded_rect(rect, padding, width, height):
+    x, y, w, h = rect
+    return max(0, x - padding), max(0, y - padding), min(width, x + w + padding), min(height, y + h + padding)
+
+
+def refine_contour(image, candidate, scale):
+    height, width = image.shape[:2]
+    x, y, w, h = cv2.boundingRect(candidate)
+    rect = (int(x / scale), int(y / scale), int(np.ceil(w / scale)), int(np.ceil(h / scale)))
+    x0, y0, x1, y1 = padded_rect(rect, int(np.ceil(1 / scale)) + REFINE_PADDING, width, height)
+
+    contours, _ = cv2.findContours(
+        object_mask(image[y0:y1, x0:x1]), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE, offset=(x0, y0)
+    )
+    if not contours:
+        return None
+    return max(contours, key=cv2.contourArea)
+
+
+def find_objects(image):
+    height, width = image.shape[:2]
+    scale = min(1.0, DETECT_MAX_SIDE / max(height, width))
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+
+    candidates, _ = cv2.findContours(object_mask(small), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_candidate_area = MIN_OBJECT_AREA * scale * scale * CANDIDATE_AREA_RATIO
+
+    objects = {}
+    for candidate in candidates:
+        if cv2.contourArea(candidate) <= min_candidate_area:
+            continue
+
+        contour = refine_contour(image, candidate, scale)
+        if contour is not None and cv2.contourArea(contour) > MIN_OBJECT_AREA:
+            objects.setdefault(cv2.boundingRect(contour), contour)
+
+    return reading_order(objects.values())
+
+
+def warp_object(image, contour):
+    height, width = image.shape[:2]
+    boxf = box_points(contour)
+    x0, y0, x1, y1 = padded_rect(cv2.boundingRect(boxf.astype(np.int32)), 2, width, height)
+    roi = image[y0:y1, x0:x1]
+
+    mask = np.zeros(roi.shape[:2], np.uint8)
+    cv2.drawContours(mask, [contour], -1, (255), cv2.FILLED, offset=(-x0, -y0))
+    mask = cv2.bitwise_and(mask, not_green(roi))
+    roi = cv2.bitwise_and(roi, roi, mask=mask)
+
+    M = cv2.getPerspectiveTransform((boxf - (x0, y0)).astype("float32"), warp_target_points(WARP_SIZE))
+    sx = TARGET_SIZE[0] / WARP_SIZE[0]
+    sy = TARGET_SIZE[1] / WARP_SIZE[1]
+    resize = np.array([[sx, 0, 0.5 * sx - 0.5], [0, sy, 0.5 * sy - 0.5], [0, 0, 1]])
+    return cv2.warpPerspective(roi, resize @ M, TARGET_SIZE, flags=cv2.INTER_LINEAR)
+
+
+def preprocess_fast(image, result):
+    processed = False
+    for contour in find_objects(image):
+        result.append({"name": "Result", "data": warp_object(image, contour), "position": object_position(contour)})
+        processed = True
 
     return processed
 
 
-def prepare_dataset(source_dir, target_dir):
+SEGMENTATION_ENGINES = {
+    "classic": preprocess_classic,
+    "fast": preprocess_fast,
+}
+
+
+def run_preprocessing(image, result, engine=None):
+    return SEGMENTATION_ENGINES[engine or SEGMENTATION_ENGINE](image, result)
+
+
+def load_source(full_path, ext, cache_dir=None, engine=None):
+    try:
+        with metriken.timer("segmentierung", "lesen"):
+            data = cache.read_bytes(full_path)
+    except OSError:
+        return None
+
+    metriken.count_image("segmentierung")
+    key = cache.stage_key("segmentierung", data, CACHE_MODULES, {"ext": ext, "engine": engine or SEGMENTATION_ENGINE}) if cache_dir else None
+    loaded = {"ext": ext, "key": key, "engine": engine}
+
+    cached = cache.load(cache_dir, key)
+    if cached is not None:
+        loaded["cached"] = cached
+        return loaded
+
+    with metriken.timer("segmentierung", "decode"):
+        loaded["image"] = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if loaded["image"] is None:
+        return None
+    return loaded
+
+
+def objects_from_cache(meta, payload):
+    objects = []
+    start = 0
+    for entry in meta["objects"]:
+        objects.append({"encoded": payload[start: start + entry["length"]], "position": entry["position"]})
+        start += entry["length"]
+    return objects
+
+
+def store_objects(cache_dir, key, objects):
+    if not cache_dir:
+        return
+    meta = {"objects": [{"length": len(obj["encoded"]), "position": obj["position"]} for obj in objects]}
+    payload = np.concatenate([obj["encoded"].ravel() for obj in objects]) if objects else None
+    cache.store(cache_dir, key, meta, payload)
+
+
+def segment_loaded(loaded, cache_dir=None):
+    if loaded is None:
+        return []
+    if "cached" in loaded:
+        return objects_from_cache(*loaded["cached"])
+
+    res = []
+    with metriken.timer("segmentierung", "compute"):
+        has_result = run_preprocessing(loaded["image"], res, loaded["engine"])
+    metriken.record_branch("segmentierung", "Objekt gefunden" if has_result else "Kein Objekt")
+    if len(res) > 1:
+        metriken.record_branch("segmentierung", "Mehrere Objekte")
+
+    objects = []
+    for item in res:
+        if item["name"] == "Result":
+            with metriken.timer("segmentierung", "encode"):
+                _, encoded = cv2.imencode(loaded["ext"], item["data"])
+            objects.append({"encoded": encoded, "position": item["position"]})
+
+    store_objects(cache_dir, loaded["key"], objects)
+    return objects
+
+
+def segment_file(full_path, ext, cache_dir=None, engine=None):
+    return segment_loaded(load_source(full_path, ext, cache_dir, engine), cache_dir)
+
+
+def load_job(job, cache_dir=None, engine=None):
+    full_path, save_path = job
+    return load_source(full_path, os.path.splitext(save_path)[1], cache_dir, engine)
+
+
+def write_encoded(encoded, save_path):
+    with metriken.timer("segmentierung", "schreiben"):
+        encoded.tofile(save_path)
+
+
+def load_store_job(job, cache_dir=None, engine=None):
+    full_path, ext = job
+    return load_source(full_path, ext, cache_dir, engine)
+
+
+def store_loaded(loaded, cache_dir=None):
+    objects = segment_loaded(loaded, cache_dir)
+    with metriken.timer("segmentierung", "decode"):
+        for obj in objects:
+            obj["image"] = cv2.imdecode(obj.pop("encoded"), cv2.IMREAD_COLOR)
+    return objects
+
+
+def object_row(name, index, count, source, position):
+    return {
+        "datei": object_name(name, index, count),
+        "quelle": source,
+        "bild": name,
+        "objekt": index + 1,
+        "position": f"{position[0]},{position[1]}",
+    }
+
+
+def prepare_dataset(source_dir, target_dir, workers=1, cache_dir=None, manifest_path=None, segmentation_engine=None):
     shutil.rmtree(target_dir, ignore_errors=True)
     os.makedirs(target_dir, exist_ok=True)
 
     print(f"[segmentierung.py] Starte Vorverarbeitung von {source_dir} nach {target_dir}...")
 
+    def iter_jobs():
+        created = set()
+        for root, name in dateien.scan_images(source_dir):
+            if not verteilung.in_shard(bruch.sorted_name(root, source_dir, name)):
+                continue
+            current_target_subdir = os.path.join(target_dir, os.path.relpath(root, source_dir))
+            if current_target_subdir not in created:
+                os.makedirs(current_target_subdir, exist_ok=True)
+                created.add(current_target_subdir)
+            yield os.path.join(root, name), os.path.join(current_target_subdir, name)
+
+    jobs, pending = itertools.tee(iter_jobs())
+
+    if manifest_path:
+        manifest.reset(manifest_path)
+
     counter = 0
+    frames = 0
+    results = puffer.imap(
+        partial(load_job, cache_dir=cache_dir, engine=segmentation_engine),
+        partial(segment_loaded, cache_dir=cache_dir),
+        pending,
+        workers,
+    )
+    with puffer.write_back() as write, manifest.writer(manifest_path) as record:
+        for (full_path, save_path), objects in zip(jobs, results):
+            frame_name = bruch.sorted_name(os.path.dirname(full_path), source_dir, os.path.basename(full_path))
+            for i, obj in enumerate(objects):
+                write(write_encoded, obj["encoded"], object_name(save_path, i, len(objects)))
+                record(object_row(frame_name, i, len(objects), full_path, obj["position"]))
+            counter += len(objects)
+            frames += bool(objects)
 
-    for root, dirs, files in os.walk(source_dir):
-        rel_path = os.path.relpath(root, source_dir)
-        current_target_subdir = os.path.join(target_dir, rel_path)
+    print(f"[segmentierung.py] Abgeschlossen. {counter} Objekte aus {frames} Bildern verarbeitet.")
 
-        os.makedirs(current_target_subdir, exist_ok=True)
 
-        for name in files:
-            if name.lower().endswith(('.jpg', '.jpeg', '.png')):
-                full_path = os.path.join(root, name)
-                image = cv2.imread(full_path)
+def prepare_store(source_dir, store_dir, workers=1, cache_dir=None, segmentation_engine=None):
+    print(f"[segmentierung.py] Starte Vorverarbeitung von {source_dir} in Speicher {store_dir}...")
 
-                if image is not None:
-                    res = []
-                    has_result = run_preprocessing(image, res)
+    jobs = (
+        (root, name)
+        for root, name in dateien.scan_images(source_dir)
+        if verteilung.in_shard(bruch.sorted_name(root, source_dir, name))
+    )
+    jobs, pending = itertools.tee(jobs)
 
-                    if has_result:
-                        for item in res:
-                            if item["name"] == "Result":
-                                save_path = os.path.join(current_target_subdir, name)
-                                cv2.imwrite(save_path, item["data"])
-                                counter += 1
+    writer = speicher.create(store_dir)
+    try:
+        results = puffer.imap(
+            partial(load_store_job, cache_dir=cache_dir, engine=segmentation_engine),
+            partial(store_loaded, cache_dir=cache_dir),
+            ((os.path.join(root, name), os.path.splitext(name)[1]) for root, name in pending),
+            workers,
+        )
+        for (root, name), objects in zip(jobs, results):
+            frame_name = bruch.sorted_name(root, source_dir, name)
+            for i, obj in enumerate(objects):
+                with metriken.timer("segmentierung", "schreiben"):
+                    speicher.append(
+                        writer, obj["image"],
+                        os.path.relpath(os.path.join(root, name), source_dir),
+                        object_name(frame_name, i, len(objects)),
+                        frame=frame_name, index=i + 1, position=obj["position"],
+                    )
+    finally:
+        count = speicher.close(writer)
 
-    print(f"[segmentierung.py] Abgeschlossen. {counter} Bilder verarbeitet.")
+    print(f"[segmentierung.py] Abgeschlossen. {count} Bilder im Speicher abgelegt.")
+    return count
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+IMAGE_SHAPE = (400, 400, 3)
+DATA_FILE = "bilder.raw"
+INDEX_FILE = "index.json"
+
+_open_stores = {}
+
+
+def create(store_dir, shape=IMAGE_SHAPE):
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.makedirs(store_dir, exist_ok=True)
+    return {
+        "dir": store_dir,
+        "shape": tuple(shape),
+        "file": open(os.path.join(store_dir, DATA_FILE), 'wb'),
+        "rows": [],
+    }
+
+
+def append(writer, image, source, name, frame=None, index=1, position=None):
+    if image.shape != writer["shape"] or image.dtype != np.uint8:
+        raise ValueError(f"Bild {source} hat Form {image.shape}, erwartet {writer['shape']}")
+    writer["file"].write(np.ascontiguousarray(image).data)
+    writer["rows"].append({"source": source, "name": name, "frame": frame or name, "object": index, "position": position})
+    return len(writer["rows"]) - 1
+
+
+def close(writer):
+    writer["file"].close()
+    index = {"shape": list(writer["shape"]), "dtype": "uint8", "rows": writer["rows"]}
+
+    index_path = os.path.join(writer["dir"], INDEX_FILE)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return len(writer["rows"])
+
+
+def open_store(store_dir):
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    stamp = os.stat(index_path).st_mtime_ns
+    store = _open_stores.get(store_dir)
+    if store is not None and store["stamp"] == stamp:
+        return store
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    shape = (len(index["rows"]), *index["shape"])
+    if shape[0]:
+        images = np.memmap(os.path.join(store_dir, DATA_FILE), dtype=index["dtype"], mode='r', shape=shape)
+    else:
+        images = np.empty(shape, dtype=index["dtype"])
+
+    store = {"stamp": stamp, "rows": index["rows"], "images": images}
+    _open_stores[store_dir] = store
+    return store
+
+
+def rows(store_dir):
+    return open_store(store_dir)["rows"]
+
+
+def image(store_dir, row):
+    return open_store(store_dir)["images"][row]
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+from scripts import farb
+from scripts import merkmale
+
+BATCHED = ["grau", "maske_1", "maske_10", "brand_maske", "pixel_10"]
+
+
+def stack(images):
+    if not images:
+        return None
+    shape = images[0].shape
+    if len(shape) != 3 or any(img.shape != shape or img.dtype != np.uint8 for img in images):
+        return None
+    return np.stack(images)
+
+
+def batch_gray(batch):
+    n, h, w, c = batch.shape
+    return cv2.cvtColor(batch.reshape(n * h, w, c), cv2.COLOR_BGR2GRAY).reshape(n, h, w)
+
+
+def batch_threshold(gray, value):
+    n, h, w = gray.shape
+    _, mask = cv2.threshold(gray.reshape(n * h, w), value, 255, cv2.THRESH_BINARY)
+    return mask.reshape(n, h, w)
+
+
+def batch_burn_mask(batch):
+    n, h, w, c = batch.shape
+    hsv = cv2.cvtColor(batch.reshape(n * h, w, c), cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, farb.BURN_LOWER, farb.BURN_UPPER).reshape(n, h, w)
+
+
+def count_nonzero(masks):
+    return np.count_nonzero(masks.reshape(len(masks), -1), axis=1)
+
+
+def batch_features(images, names=BATCHED):
+    features = [merkmale.for_image(img) for img in images]
+    batch = stack(images)
+    wanted = set(names)
+    if batch is None or not wanted & set(BATCHED):
+        return features
+
+    def assign(name, values):
+        for f, value in zip(features, values):
+            f[name] = value
+
+    if wanted & {"grau", "maske_1", "maske_10", "pixel_10"}:
+        gray = batch_gray(batch)
+        assign("grau", gray)
+        if "maske_1" in wanted:
+            assign("maske_1", batch_threshold(gray, 1))
+        if wanted & {"maske_10", "pixel_10"}:
+            mask_10 = batch_threshold(gray, 10)
+            assign("maske_10", mask_10)
+            if "pixel_10" in wanted:
+                assign("pixel_10", [int(v) for v in count_nonzero(mask_10)])
+    if "brand_maske" in wanted:
+        assign("brand_maske", batch_burn_mask(batch))
+    return features
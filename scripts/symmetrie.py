@@ -1,22 +1,23 @@
 import cv2
+import itertools
+import numpy as np
 import os
+import re
+from functools import partial
 
+from scripts import dateien
+from scripts import manifest
+from scripts import merkmale
+from scripts import metriken
+from scripts import puffer
 
-def get_symmetry_score(image_bgr):
-    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
+SYMMETRY_ENGINE = "affine"
+POLAR_ANGLE_BINS = 360
+REQUIRED_FEATURES = ["maske_10", "pixel_10", "momente_10"]
+SCORED_PATTERN = re.compile(r"^\d+\.\d{2}_")
 
-    total_pixels = cv2.countNonZero(mask)
-    if total_pixels == 0:
-        return 0.0
-
-    moments = cv2.moments(mask)
-    if moments["m00"] == 0:
-        return 0.0
-
-    cx = int(moments["m10"] / moments["m00"])
-    cy = int(moments["m01"] / moments["m00"])
 
+def asymmetry_affine(mask, cx, cy):
     h, w = mask.shape[:2]
 
     symmetric_core = mask.copy()
@@ -27,45 +28,128 @@ def get_symmetry_score(image_bgr):
         symmetric_core = cv2.bitwise_and(symmetric_core, rotated_mask)
 
     asymmetric_mask = cv2.subtract(mask, symmetric_core)
-    asymmetric_pixel_count = cv2.countNonZero(asymmetric_mask)
+    return cv2.countNonZero(asymmetric_mask) / cv2.countNonZero(mask)
+
+
+def asymmetry_polar(mask, cx, cy):
+    x, y, w, h = cv2.boundingRect(mask)
+    corners = np.array([[x, y], [x + w, y], [x, y + h], [x + w, y + h]]) - (cx, cy)
+    max_radius = float(np.sqrt((corners * corners).sum(axis=1).max()))
+    radial_bins = max(1, int(np.ceil(max_radius)))
+
+    polar = cv2.warpPolar(
+        mask, (radial_bins, POLAR_ANGLE_BINS), (cx, cy), max_radius,
+        cv2.INTER_NEAREST | cv2.WARP_POLAR_LINEAR | cv2.WARP_FILL_OUTLIERS,
+    ) > 0
+
+    step = POLAR_ANGLE_BINS // 6
+    symmetric_core = polar.copy()
+    for shift in range(step, POLAR_ANGLE_BINS, step):
+        symmetric_core &= np.roll(polar, shift, axis=0)
+
+    area_weights = np.arange(radial_bins) + 0.5
+    total = (polar.sum(axis=0) * area_weights).sum()
+    if total == 0:
+        return 1.0
+
+    asymmetric = ((polar & ~symmetric_core).sum(axis=0) * area_weights).sum()
+    return asymmetric / total
+
+
+SYMMETRY_ENGINES = {
+    "affine": asymmetry_affine,
+    "polar": asymmetry_polar,
+}
+
+
+def get_symmetry_score(image_bgr, engine=None, features=None):
+    features = merkmale.ensure(image_bgr, features)
+    mask = merkmale.get(features, "maske_10")
+
+    total_pixels = merkmale.get(features, "pixel_10")
+    if total_pixels == 0:
+        return 0.0
 
-    error_ratio = asymmetric_pixel_count / total_pixels
+    moments = merkmale.get(features, "momente_10")
+    if moments["m00"] == 0:
+        return 0.0
+
+    cx = int(moments["m10"] / moments["m00"])
+    cy = int(moments["m01"] / moments["m00"])
+
+    error_ratio = float(SYMMETRY_ENGINES[engine or SYMMETRY_ENGINE](mask, cx, cy))
     score = (1.0 - error_ratio) * 100.0
 
     return max(0.0, min(100.0, round(score, 2)))
 
 
-def run_symmetry_check(sorted_dir):
-    print("\n[symmetrie.py] Starte Symmetrie-Analyse für Klasse 'Normal'...")
+def scored_filename(score, filename):
+    return f"{score:05.2f}_{filename}"
 
-    normal_path = os.path.join(sorted_dir, "Normal")
 
-    count = 0
-    scores = []
+def is_scored(filename):
+    return SCORED_PATTERN.match(filename) is not None
 
-    for root, _, files in os.walk(normal_path):
-        for filename in files:
-            if not filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                continue
 
-            file_path = os.path.join(root, filename)
-            image = cv2.imread(file_path)
+def load_image(file_path):
+    with metriken.timer("symmetrie", "decode"):
+        return cv2.imread(file_path)
 
-            if image is None:
-                continue
 
-            score = get_symmetry_score(image)
-            scores.append(score)
+def score_loaded(image, engine=None):
+    if image is None:
+        return None
+
+    metriken.count_image("symmetrie")
+    with metriken.timer("symmetrie", "compute"):
+        return get_symmetry_score(image, engine)
+
+
+def rename_file(root, filename, new_filename, errors):
+    try:
+        os.rename(os.path.join(root, filename), os.path.join(root, new_filename))
+    except OSError as e:
+        errors.append((root, filename))
+        print(f"Fehler beim Umbenennen von {filename}: {e}")
+
+
+def run_symmetry_check(sorted_dir, workers=1, engine=None):
+    print(f"\n[symmetrie.py] Starte Symmetrie-Analyse für Klasse 'Normal' (Verfahren: {engine or SYMMETRY_ENGINE})...")
+
+    normal_path = os.path.join(sorted_dir, "Normal")
+
+    count = 0
+    score_sum = 0.0
+
+    # Umbenannte Dateien bleiben im selben Ordner; Namen mit Score-Präfix werden bei der Aufzählung übersprungen.
+    jobs = dateien.scan_images(normal_path, skip=is_scored)
+    jobs, pending = itertools.tee(jobs)
+
+    results = puffer.imap(
+        load_image,
+        partial(score_loaded, engine=engine),
+        (os.path.join(root, filename) for root, filename in pending),
+        workers,
+    )
+    errors = []
+
+    with puffer.write_back() as write, manifest.writer(manifest.path_for(sorted_dir)) as record:
+        for (root, filename), score in zip(jobs, results):
+            if score is None:
+                continue
 
-            new_filename = f"{score:05.2f}_{filename}"
-            new_path = os.path.join(root, new_filename)
+            score_sum += score
+            new_filename = scored_filename(score, filename)
+            write(rename_file, root, filename, new_filename, errors)
+            record({"datei": filename, "symmetrie": score, "pfad": os.path.join(root, new_filename)})
+            count += 1
 
-            try:
-                os.rename(file_path, new_path)
-                count += 1
-            except OSError as e:
-                print(f"Fehler beim Umbenennen von {filename}: {e}")
+    manifest.write(
+        manifest.path_for(sorted_dir),
+        [{"datei": filename, "pfad": os.path.join(root, filename)} for root, filename in errors],
+    )
 
-    avg_score = sum(scores) / len(scores) if scores else 0
+    avg_score = score_sum / count if count else 0
+    count -= len(errors)
     print(f"[symmetrie.py] Abgeschlossen. {count} Bilder bewertet und umbenannt.")
     print(f"   -> Durchschnittlicher Symmetrie-Score: {avg_score:.2f}")
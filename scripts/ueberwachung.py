@@ -0,0 +1,260 @@
+import csv
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from scripts import bruch
+from scripts import dateien
+from scripts import manifest
+from scripts import pipeline
+
+POLL_INTERVAL = 1.0
+QUEUE_SIZE = 64
+LATENCY_WINDOW = 1000
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+EVENT_HEADER = struct.Struct("iIII")
+
+LOG_FIELDS = [
+    "zeit", "datei", "klasse", "grund", "symmetrie", "fleckflaeche", "kantensumme", "verarbeitung_ms", "latenz_ms",
+    "objekt", "position",
+]
+
+
+def poll_files(watch_dir, stop_event, interval=POLL_INTERVAL):
+    known = {}
+    pending = {}
+
+    for root, file_name in dateien.scan_images(watch_dir):
+        known[os.path.join(root, file_name)] = None
+
+    while not stop_event.is_set():
+        current = set()
+        for root, file_name in dateien.scan_images(watch_dir):
+            path = os.path.join(root, file_name)
+            current.add(path)
+            if path in known:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if pending.get(path) == size:
+                del pending[path]
+                known[path] = size
+                yield path
+            else:
+                pending[path] = size
+
+        for path in list(known):
+            if path not in current:
+                del known[path]
+
+        stop_event.wait(interval)
+
+
+def _inotify_library():
+    if not sys.platform.startswith("linux"):
+        return None
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    libc = ctypes.CDLL(name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+def inotify_available():
+    return _inotify_library() is not None
+
+
+def inotify_files(watch_dir, stop_event, interval=POLL_INTERVAL):
+    libc = _inotify_library()
+    fd = libc.inotify_init1(IN_NONBLOCK)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+
+    watches = {}
+
+    def add_watch(path):
+        wd = libc.inotify_add_watch(fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+        if wd >= 0:
+            watches[wd] = path
+
+    try:
+        for root, _, _ in os.walk(watch_dir):
+            add_watch(root)
+
+        while not stop_event.is_set():
+            readable, _, _ = select.select([fd], [], [], interval)
+            if not readable:
+                continue
+
+            buffer = os.read(fd, 64 * 1024)
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset: offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+
+                path = os.path.join(watches.get(wd, watch_dir), name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        add_watch(path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and dateien.is_image(name):
+                    yield path
+    finally:
+        os.close(fd)
+
+
+def append_log(log_path, row):
+    new_file = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def _consume(jobs, watch_dir, target_dir, log_path, symmetry_engine, segmentation_engine, latencies, lock):
+    while True:
+        job = jobs.get()
+        if job is None:
+            jobs.task_done()
+            return
+
+        # Fehler beim Schreiben dürfen den Verbraucher nicht beenden, sonst wartet die Warteschlange ewig.
+        try:
+            _handle(job, watch_dir, target_dir, log_path, symmetry_engine, segmentation_engine, latencies, lock)
+        except Exception as e:
+            print(f"[ueberwachung.py] Fehler bei {job[0]}: {e}")
+        finally:
+            jobs.task_done()
+
+
+def _handle(job, watch_dir, target_dir, log_path, symmetry_engine, segmentation_engine, latencies, lock):
+    path, detected_at = job
+    name = bruch.sorted_name(os.path.dirname(path), watch_dir, os.path.basename(path))
+
+    start = time.perf_counter()
+    try:
+        records = pipeline.process_file(path, name, symmetry_engine, segmentation_engine=segmentation_engine)
+    except Exception as e:
+        records = []
+        print(f"[ueberwachung.py] Fehler bei {name}: {e}")
+    done = time.perf_counter()
+
+    process_ms = (done - start) * 1000
+    latency_ms = (done - detected_at) * 1000
+
+    with lock:
+        if not records:
+            row = {"zeit": datetime.now().isoformat(timespec="milliseconds"), "datei": path, "klasse": "",
+                   "grund": "Kein Objekt", "verarbeitung_ms": f"{process_ms:.1f}", "latenz_ms": f"{latency_ms:.1f}"}
+            print(f"   [--] {name} -> kein Objekt ({process_ms:.1f} ms)")
+            append_log(log_path, row)
+        for record in records:
+            target_path = pipeline.write_record(record, target_dir)
+            manifest.write(manifest.path_for(target_dir), [manifest.record_row(record, "ueberwachung", target_path)])
+            row = {
+                "zeit": datetime.now().isoformat(timespec="milliseconds"),
+                "datei": path,
+                "klasse": record["category"],
+                "grund": record["reason"],
+                "symmetrie": record["symmetry"],
+                "fleckflaeche": record["spot_area"],
+                "kantensumme": record["edge_sum"],
+                "verarbeitung_ms": f"{process_ms:.1f}",
+                "latenz_ms": f"{latency_ms:.1f}",
+                "objekt": record["object"],
+                "position": ",".join(str(v) for v in record["position"]),
+            }
+            print(f"   [{record['category']}] {record['name']} -> {record['reason']} ({process_ms:.1f} ms, Latenz {latency_ms:.1f} ms)")
+            append_log(log_path, row)
+        latencies["count"] += 1
+        latencies["sum"] += latency_ms
+        latencies["max"] = max(latencies["max"], latency_ms)
+        latencies["recent"].append(latency_ms)
+
+
+def watch_folder(watch_dir, target_dir, log_path, workers=1, symmetry_engine=None, use_inotify=None,
+                 queue_size=QUEUE_SIZE, idle_exit=0, segmentation_engine=None):
+    if use_inotify is None:
+        use_inotify = inotify_available()
+
+    for c in pipeline.CLASSES:
+        os.makedirs(os.path.join(target_dir, c), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+
+    mode = "inotify" if use_inotify else "Polling"
+    print(f"\n[ueberwachung.py] Überwache {watch_dir} ({mode}, {workers} Worker, Warteschlange {queue_size})...")
+    print(f"   -> Ergebnisse: {log_path}")
+    print("   -> Beenden mit Strg+C")
+
+    jobs = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    lock = threading.Lock()
+    latencies = {"count": 0, "sum": 0.0, "max": 0.0, "recent": deque(maxlen=LATENCY_WINDOW)}
+
+    consumers = [
+        threading.Thread(
+            target=_consume,
+            args=(jobs, watch_dir, target_dir, log_path, symmetry_engine, segmentation_engine, latencies, lock),
+            daemon=True,
+        )
+        for _ in range(max(1, workers))
+    ]
+    for t in consumers:
+        t.start()
+
+    source = inotify_files if use_inotify else poll_files
+    last_activity = time.monotonic()
+
+    def check_idle():
+        if idle_exit and jobs.unfinished_tasks == 0 and time.monotonic() - last_activity > idle_exit:
+            stop_event.set()
+
+    ticker = None
+    if idle_exit:
+        def tick():
+            while not stop_event.wait(POLL_INTERVAL / 2):
+                check_idle()
+        ticker = threading.Thread(target=tick, daemon=True)
+        ticker.start()
+
+    try:
+        for path in source(watch_dir, stop_event):
+            jobs.put((path, time.perf_counter()))
+            last_activity = time.monotonic()
+    except KeyboardInterrupt:
+        print("\n[ueberwachung.py] Beende Überwachung...")
+    finally:
+        stop_event.set()
+        for _ in consumers:
+            jobs.put(None)
+        for t in consumers:
+            t.join()
+        if ticker is not None:
+            ticker.join()
+
+    if latencies["count"]:
+        recent = sorted(latencies["recent"])
+        p95 = recent[min(len(recent) - 1, int(0.95 * len(recent)))]
+        print(f"[ueberwachung.py] {latencies['count']} Bilder geprüft. Latenz Mittel {latencies['sum'] / latencies['count']:.1f} ms, "
+              f"p95 (letzte {len(recent)}) {p95:.1f} ms, max {latencies['max']:.1f} ms")
+    else:
+        print("[ueberwachung.py] Keine neuen Bilder geprüft.")
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from scripts import manifest
+
+SHARD = None
+SHARDS_DIR = "shards"
+SHARD_INFO_FILE = "shard.json"
+
+
+def parse_shard(text):
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard '{text}' hat nicht die Form I/K") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard '{text}': es gilt 0 <= I < K")
+    return index, count
+
+
+def shard_of(name, count):
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def in_shard(name, shard=None):
+    shard = shard or SHARD
+    return shard is None or shard_of(name, shard[1]) == shard[0]
+
+
+def shard_dir(output_dir, shard):
+    index, count = shard
+    return os.path.join(output_dir, SHARDS_DIR, f"{index:03d}-von-{count:03d}")
+
+
+def clear_shard_info(output_dir):
+    try:
+        os.remove(os.path.join(output_dir, SHARD_INFO_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def write_shard_info(output_dir, shard, sorted_dir, elapsed):
+    frames, objects, classes = manifest.summary(manifest.path_for(sorted_dir))
+
+    info = {
+        "shard": shard[0],
+        "shards": shard[1],
+        "bilder": frames,
+        "objekte": objects,
+        "klassen": classes,
+        "sekunden": round(elapsed, 2),
+        "sorted": os.path.relpath(sorted_dir, output_dir),
+    }
+    info_path = os.path.join(output_dir, SHARD_INFO_FILE)
+    tmp_path = f"{info_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, info_path)
+
+    print(f"[verteilung.py] Shard {shard[0]}/{shard[1]} fertig: {info['bilder']} Bilder, {info['objekte']} Objekte, "
+          f"{classes} ({elapsed:.1f} s)")
+    print(f"   -> Teilergebnis in {output_dir}; zusammenführen mit --merge-shards")
+    return info
+
+
+def find_shards(shards_root):
+    shards = []
+    if not os.path.isdir(shards_root):
+        return shards
+    for entry in sorted(os.scandir(shards_root), key=lambda e: e.name):
+        info_path = os.path.join(entry.path, SHARD_INFO_FILE)
+        if entry.is_dir() and os.path.isfile(info_path):
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            info["dir"] = entry.path
+            shards.append(info)
+    return shards
+
+
+def check_complete(shards):
+    counts = {info["shards"] for info in shards}
+    if len(counts) != 1:
+        return f"Teilergebnisse mit unterschiedlicher Shard-Zahl gefunden: {sorted(counts)}"
+    count = counts.pop()
+    present = {info["shard"] for info in shards}
+    missing = [i for i in range(count) if i not in present]
+    if missing:
+        return f"Es fehlen Shards {missing} von {count}"
+    if len(shards) != count:
+        return "Mindestens ein Shard liegt doppelt vor"
+    return None
+
+
+def place_file(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def merge_shards(shards_root, target_dir, manifest_path):
+    shards = find_shards(shards_root)
+    if not shards:
+        print(f"[verteilung.py] Fehler: Keine fertigen Shards in {shards_root}.")
+        return None
+    problem = check_complete(shards)
+    if problem:
+        print(f"[verteilung.py] Fehler: {problem}. Veraltete Teilergebnisse in {shards_root} vorher löschen.")
+        return None
+
+    print(f"\n[verteilung.py] Führe {len(shards)} Shards aus {shards_root} nach {target_dir} zusammen...")
+    start = time.perf_counter()
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.makedirs(target_dir, exist_ok=True)
+    manifest.reset(manifest_path)
+
+    for info in sorted(shards, key=lambda i: i["shard"]):
+        sorted_dir = os.path.join(info["dir"], info["sorted"])
+        with manifest.writer(manifest_path) as record:
+            for row in manifest.iter_rows(manifest.path_for(sorted_dir)):
+                if row["pfad"]:
+                    category = os.path.basename(os.path.dirname(row["pfad"]))
+                    src = os.path.join(sorted_dir, category, os.path.basename(row["pfad"]))
+                    dst = os.path.join(target_dir, category, os.path.basename(row["pfad"]))
+                    if os.path.exists(src):
+                        os.makedirs(os.path.dirname(dst), exist_ok=True)
+                        place_file(src, dst)
+                        row["pfad"] = dst
+                    else:
+                        row["pfad"] = None
+                record(row)
+
+        print(f"   Shard {info['shard']:>3}/{info['shards']}: {info['bilder']:>6} Bilder, {info['objekte']:>6} Objekte, "
+              f"{info['sekunden']:>8.1f} s")
+
+    _, objects, classes = manifest.summary(manifest_path)
+    expected = sum(info["objekte"] for info in shards)
+    if objects != expected:
+        print(f"   [Warnung] {expected - objects} Objekte kommen in mehreren Shards vor und wurden nur einmal übernommen.")
+
+    wall = max(info["sekunden"] for info in shards)
+    total = sum(info["sekunden"] for info in shards)
+    print(f"[verteilung.py] Fertig: {objects} Objekte, {classes}")
+    print(f"   -> Rechenzeit gesamt {total:.1f} s, längster Shard {wall:.1f} s, Zusammenführen "
+          f"{time.perf_counter() - start:.1f} s")
+    return objects
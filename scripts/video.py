@@ -0,0 +1,236 @@
+import math
+import os
+import re
+import time
+from collections import deque
+
+import cv2
+
+from scripts import kaskade
+from scripts import manifest
+from scripts import metriken
+from scripts import pipeline
+from scripts import segmentierung
+
+DEFAULT_FPS = 25.0
+LATENCY_BUDGET_MS = None
+MAX_MATCH_DISTANCE = 0.25
+MAX_MISSING_FRAMES = 5
+MAX_DEFERRED_FRAMES = 3
+EDGE_MARGIN = 4
+ESTIMATE_WEIGHT = 0.3
+DEGRADED_ORDER = ["komplexitaet", "geometrie"]
+LATENCY_WINDOW = 1000
+OUTPUT_EXT = ".jpg"
+
+
+def open_source(source):
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        return None, 0
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    return capture, fps if fps and fps > 0 and math.isfinite(fps) else DEFAULT_FPS
+
+
+def source_stem(source):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    if "%" in stem:
+        stem = os.path.basename(os.path.dirname(os.path.abspath(source)))
+    return re.sub(r"[^\w-]", "", stem) or "video"
+
+
+def fully_visible(contour, shape, margin=EDGE_MARGIN):
+    x, y, w, h = cv2.boundingRect(contour)
+    return x >= margin and y >= margin and x + w <= shape[1] - margin and y + h <= shape[0] - margin
+
+
+def match_tracks(tracks, detections, max_distance):
+    pairs = sorted(
+        (math.dist(track["position"], det["position"]), track_id, i)
+        for track_id, track in tracks.items()
+        for i, det in enumerate(detections)
+    )
+
+    matched_tracks = set()
+    matches = {}
+    for distance, track_id, i in pairs:
+        if distance > max_distance:
+            break
+        if track_id in matched_tracks or i in matches:
+            continue
+        matched_tracks.add(track_id)
+        matches[i] = track_id
+    return matches
+
+
+def update_tracks(tracks, detections, next_id, max_distance):
+    matches = match_tracks(tracks, detections, max_distance)
+    for track in tracks.values():
+        track["missing"] += 1
+
+    for i, det in enumerate(detections):
+        track_id = matches.get(i)
+        if track_id is None:
+            track_id = next_id
+            next_id += 1
+            tracks[track_id] = {"classified": False, "deferred": 0, "first_frame": det["frame"]}
+            metriken.record_branch("video", "Neue Spur")
+        tracks[track_id].update(det, missing=0)
+
+    lost = [track_id for track_id, track in tracks.items() if track["missing"] > MAX_MISSING_FRAMES]
+    return next_id, [(track_id, tracks.pop(track_id)) for track_id in lost]
+
+
+def update_estimate(estimates, mode, elapsed_ms):
+    previous = estimates.get(mode)
+    estimates[mode] = elapsed_ms if previous is None else (1 - ESTIMATE_WEIGHT) * previous + ESTIMATE_WEIGHT * elapsed_ms
+
+
+def choose_mode(remaining_ms, estimates, deferred=0):
+    if remaining_ms is None:
+        return "voll"
+    for mode in ("voll", "reduziert"):
+        if estimates.get(mode) is None or estimates[mode] <= remaining_ms:
+            return mode
+    # Lieber das Budget einmal überziehen als den Snack ungeprüft vorbeilaufen lassen.
+    return "reduziert" if deferred >= MAX_DEFERRED_FRAMES else None
+
+
+def classify_track(frame_image, track, mode, symmetry_engine=None):
+    warped = segmentierung.warp_object(frame_image, track["contour"])
+    _, encoded = cv2.imencode(OUTPUT_EXT, warped)
+    if pipeline.REPRODUCE_INTERMEDIATE_CODEC:
+        warped = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+    if mode == "voll":
+        record = pipeline.classify_image(warped, symmetry_engine)
+    else:
+        record = kaskade.classify(warped, symmetry_engine, order=DEGRADED_ORDER, scores=False)
+
+    record["output"] = pipeline.encode_output(record, warped, encoded, OUTPUT_EXT)
+    return record
+
+
+def write_track(record, track_id, track, source, target_dir, manifest_path, mode):
+    stem = source_stem(source)
+    record.update(
+        name=f"{stem}_{track_id:04d}{OUTPUT_EXT}",
+        source=f"{source}#{track['frame']}",
+        frame=os.path.basename(source),
+        object=track_id,
+        position=track["position"],
+    )
+    target_path = pipeline.write_record(record, target_dir)
+    stage = "video" if mode == "voll" else "video-reduziert"
+    manifest.write(manifest_path, [manifest.record_row(record, stage, target_path)])
+    return target_path
+
+
+def run_video(source, target_dir, budget_ms=LATENCY_BUDGET_MS, symmetry_engine=None):
+    capture, fps = open_source(source)
+    if capture is None:
+        print(f"[video.py] Fehler: {source} kann nicht geöffnet werden.")
+        return None
+
+    for c in pipeline.CLASSES:
+        os.makedirs(os.path.join(target_dir, c), exist_ok=True)
+    manifest_path = manifest.path_for(target_dir)
+
+    frame_interval = 1.0 / fps
+    budget_ms = budget_ms if budget_ms is not None else frame_interval * 1000
+    budget_text = f"Budget {budget_ms:.1f} ms pro Bild" if budget_ms else "ohne Zeitbudget"
+    print(f"\n[video.py] Lese {source} ({fps:.1f} Bilder/s, {budget_text})...")
+
+    stats = {"gelesen": 0, "verworfen": 0, "spuren": 0, "voll": 0, "reduziert": 0, "verschoben": 0, "verpasst": 0}
+    classes = {c: 0 for c in pipeline.CLASSES}
+    latencies = deque(maxlen=LATENCY_WINDOW)
+    estimates = {}
+    tracks = {}
+    next_id = 1
+    max_distance = None
+    frame_index = -1
+    started = time.perf_counter()
+
+    try:
+        while capture.grab():
+            frame_index += 1
+            stats["gelesen"] += 1
+
+            if budget_ms and time.perf_counter() - (started + frame_index * frame_interval) > frame_interval:
+                stats["verworfen"] += 1
+                metriken.record_branch("video", "Bild verworfen")
+                continue
+
+            frame_start = time.perf_counter()
+            with metriken.timer("video", "decode"):
+                ok, image = capture.retrieve()
+            if not ok:
+                continue
+            metriken.count_image("video")
+
+            if max_distance is None:
+                max_distance = MAX_MATCH_DISTANCE * math.hypot(image.shape[0], image.shape[1])
+
+            with metriken.timer("video", "erkennung"):
+                detections = [
+                    {"position": segmentierung.object_position(c), "contour": c, "frame": frame_index,
+                     "visible": fully_visible(c, image.shape)}
+                    for c in segmentierung.find_objects(image)
+                ]
+            next_id, lost = update_tracks(tracks, detections, next_id, max_distance)
+
+            for track_id, track in lost:
+                stats["spuren"] += 1
+                if not track["classified"]:
+                    stats["verpasst"] += 1
+                    metriken.record_branch("video", "Spur verpasst")
+
+            for track_id, track in sorted(tracks.items()):
+                if track["classified"] or track["missing"] or not track["visible"]:
+                    continue
+
+                elapsed_ms = (time.perf_counter() - frame_start) * 1000
+                mode = choose_mode(budget_ms - elapsed_ms if budget_ms else None, estimates, track["deferred"])
+                if mode is None:
+                    track["deferred"] += 1
+                    stats["verschoben"] += 1
+                    metriken.record_branch("video", "Prüfung verschoben")
+                    continue
+
+                check_start = time.perf_counter()
+                with metriken.timer("video", f"pruefung_{mode}"):
+                    record = classify_track(image, track, mode, symmetry_engine)
+                update_estimate(estimates, mode, (time.perf_counter() - check_start) * 1000)
+
+                with metriken.timer("video", "schreiben"):
+                    write_track(record, track_id, track, source, target_dir, manifest_path, mode)
+                track["classified"] = True
+                stats[mode] += 1
+                classes[record["category"]] += 1
+                metriken.record_branch("video", f"Prüfung {mode}")
+                print(f"   [{record['category']}] Spur {track_id} (Bild {frame_index}) -> {record['reason']}"
+                      f"{'' if mode == 'voll' else ' (reduziert)'}")
+
+            latencies.append((time.perf_counter() - frame_start) * 1000)
+    except KeyboardInterrupt:
+        print("\n[video.py] Abbruch...")
+    finally:
+        capture.release()
+
+    for track in tracks.values():
+        stats["spuren"] += 1
+        if not track["classified"]:
+            stats["verpasst"] += 1
+            metriken.record_branch("video", "Spur verpasst")
+
+    print(f"[video.py] Fertig: {stats['gelesen']} Bilder gelesen, {stats['verworfen']} verworfen, {stats['spuren']} Spuren, "
+          f"{stats['voll']} voll und {stats['reduziert']} reduziert geprüft ({stats['verschoben']}x verschoben), "
+          f"{stats['verpasst']} verpasst.")
+    print(f"   -> Klassen: {classes}")
+    if latencies:
+        recent = sorted(latencies)
+        p95 = recent[min(len(recent) - 1, int(0.95 * len(recent)))]
+        over = sum(1 for value in recent if budget_ms and value > budget_ms)
+        print(f"   -> Zeit pro Bild: Mittel {sum(recent) / len(recent):.1f} ms, p95 {p95:.1f} ms, max {recent[-1]:.1f} ms, "
+              f"über Budget: {over}")
+    return stats
@@ -0,0 +1,129 @@
+import math
+
+import cv2
+import numpy as np
+
+from scripts import bruch
+from scripts import farb
+from scripts import merkmale
+from scripts import rest
+from scripts import segmentierung
+from scripts import symmetrie
+
+BACKGROUND_BGR = (40, 160, 60)
+SNACK_BGR = (90, 170, 215)
+SPOT_BGR = (20, 30, 45)
+KINDS = ["normal", "breakage", "spot", "fragment"]
+
+
+def render_snack(kind, height=600, seed=0):
+    rng = np.random.default_rng(seed)
+    width = int(height * 1.3)
+    noise = rng.integers(-10, 10, (height, width, 3))
+    image = np.clip(np.array(BACKGROUND_BGR, np.int16) + noise, 0, 255).astype(np.uint8)
+
+    cx = width / 2 + rng.uniform(-0.025, 0.025) * height
+    cy = height / 2 + rng.uniform(-0.025, 0.025) * height
+    radius = height * 0.3
+    rotation = rng.uniform(0, math.pi / 3)
+
+    def polar(r, angle):
+        return [cx + r * math.cos(angle), cy + r * math.sin(angle)]
+
+    shape = np.zeros((height, width), np.uint8)
+    cv2.fillPoly(shape, [np.array([polar(radius, rotation + k * math.pi / 3) for k in range(6)], np.int32)], 255)
+
+    hub, outer, gap = radius * 0.22, radius * 0.80, 0.25
+    for k in range(6):
+        a0 = rotation + k * math.pi / 3 + gap
+        a1 = rotation + (k + 1) * math.pi / 3 - gap
+        window = np.array([polar(hub / math.cos(gap), (a0 + a1) / 2), polar(outer, a0), polar(outer, a1)], np.int32)
+        cv2.fillPoly(shape, [window], 0)
+
+    if kind == "breakage":
+        bite = polar(radius, rotation + 0.4)
+        cv2.circle(shape, (int(bite[0]), int(bite[1])), int(radius * 0.35), 0, -1)
+    if kind == "fragment":
+        shape[:, :int(cx)] = 0
+
+    image[shape > 0] = SNACK_BGR
+    if kind == "spot":
+        spot = polar(radius * 0.5, rotation)
+        spot_mask = np.zeros_like(shape)
+        cv2.circle(spot_mask, (int(spot[0]), int(spot[1])), max(1, int(height * 0.02)), 255, -1)
+        image[(spot_mask > 0) & (shape > 0)] = SPOT_BGR
+    return image
+
+
+def warped_images(count, height=600, seed=0):
+    images = []
+    for i in range(count):
+        res = []
+        if segmentierung.run_preprocessing(render_snack(KINDS[i % len(KINDS)], height, seed + i), res):
+            images.append(res[-1]["data"])
+    return images
+
+
+def legacy_classify(image, symmetry_engine=None):
+    # Feste Reihenfolge Geometrie -> Komplexität -> Farbe -> Symmetrie, wie vor der Kaskade.
+    record = {"category": None, "reason": None, "edge_sum": None, "spot_area": None, "contours": [], "symmetry": None}
+
+    cat, reason = bruch.analyze_snack_geometry(image)
+    if cat not in ["Normal", "Bruch", "Rest"]:
+        cat = "Rest"
+    record["category"] = cat
+    record["reason"] = reason
+
+    if cat in ["Normal", "Bruch"]:
+        verdict, edge_sum, clean_edge_sum = rest.check_complexity(image)
+        record["edge_sum"] = edge_sum
+        if verdict == "Fragment":
+            record["category"] = "Rest"
+            record["reason"] = f"Fragment (Sum: {edge_sum} < {rest.MIN_EDGE_SUM})"
+        elif verdict == "Chaos":
+            record["category"] = "Rest"
+            record["reason"] = f"Chaos (Clean Sum: {clean_edge_sum})"
+
+    if record["category"] == "Normal":
+        result = farb.detect_defects(image, spot_threshold=farb.SPOT_THRESHOLD)
+        record["spot_area"] = result["spot_area"]
+        if result["is_defective"]:
+            record["category"] = "Farbfehler"
+            record["reason"] = f"Farbfehler (Fläche {result['spot_area']:.0f})"
+            record["contours"] = result["contours"]
+
+    if record["category"] == "Normal":
+        record["symmetry"] = symmetrie.get_symmetry_score(image, symmetry_engine)
+
+    return record
+
+
+def comparable(record):
+    return {k: v for k, v in record.items() if k != "contours"}, len(record["contours"])
+
+
+def full_frame_defects(image, spot_threshold=43):
+    # Farbprüfung auf dem Gesamtbild, wie vor dem Zuschnitt auf den Objektausschnitt.
+    features = merkmale.for_image(image)
+    gray = merkmale.get(features, "grau")
+    mask_obj = merkmale.get(features, "maske_10")
+    mask_analysis = cv2.erode(mask_obj, np.ones((13, 13), np.uint8), iterations=1)
+    kernel_morph = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (21, 21))
+    blackhat_img = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, kernel_morph)
+    _, mask_defects_contrast = cv2.threshold(blackhat_img, 45, 255, cv2.THRESH_BINARY)
+
+    mask_burn = merkmale.get(features, "brand_maske")
+
+    combined_defects = cv2.bitwise_or(mask_defects_contrast, mask_burn)
+    valid_defects = cv2.bitwise_and(combined_defects, combined_defects, mask=mask_analysis)
+    valid_defects = cv2.morphologyEx(valid_defects, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(valid_defects, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    significant_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > 35]
+    total_defect_area = sum(cv2.contourArea(cnt) for cnt in significant_contours)
+
+    return {
+        "is_defective": total_defect_area > spot_threshold,
+        "spot_area": total_defect_area,
+        "contours": significant_contours
+    }
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import farb
+from tests.referenz import SPOT_BGR, full_frame_defects, warped_images
+
+COUNT = 8
+CANVAS = 400
+SCALE = 0.55
+# Linke obere Ecke des verkleinerten Snacks: Mitte, an jeder Kante, in einer Ecke und teilweise außerhalb.
+PLACEMENTS = [(90, 90), (0, 90), (180, 90), (90, 0), (90, 180), (0, 0), (-40, 120), (220, 220)]
+SPOT_ANGLES = range(0, 360, 60)
+MIN_BORDER_SPOTS = 5
+
+
+def with_spots(image):
+    # Zusätzliche Flecken am Objektrand, damit sie nach dem Platzieren an den Bildrand geraten.
+    mask = cv2.threshold(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 10, 255, cv2.THRESH_BINARY)[1]
+    ys, xs = np.nonzero(mask)
+    cx, cy = xs.mean(), ys.mean()
+    radius = 0.7 * np.sqrt(len(xs) / np.pi)
+    spotted = image.copy()
+    for angle in SPOT_ANGLES:
+        x = int(cx + radius * np.cos(np.radians(angle)))
+        y = int(cy + radius * np.sin(np.radians(angle)))
+        if mask[y, x]:
+            cv2.circle(spotted, (x, y), 10, SPOT_BGR, -1)
+    return spotted
+
+
+def placed(image, x, y):
+    small = cv2.resize(image, None, fx=SCALE, fy=SCALE, interpolation=cv2.INTER_NEAREST)
+    matrix = np.float32([[1, 0, x], [0, 1, y]])
+    return cv2.warpAffine(small, matrix, (CANVAS, CANVAS), flags=cv2.INTER_NEAREST, borderValue=0)
+
+
+def spot_mask(shape, contours):
+    mask = np.zeros(shape[:2], np.uint8)
+    cv2.drawContours(mask, contours, -1, 255, -1)
+    return mask
+
+
+class FarbRoiTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        base = warped_images(COUNT)
+        cls.cases = [
+            (f"Bild {i}{' mit Flecken' if spots else ''} bei {x},{y}", placed(with_spots(image) if spots else image, x, y))
+            for i, image in enumerate(base)
+            for spots in (False, True)
+            for x, y in PLACEMENTS
+        ]
+
+    def assert_same(self, image, label):
+        expected = full_frame_defects(image, farb.SPOT_THRESHOLD)
+        result = farb.detect_defects(image, spot_threshold=farb.SPOT_THRESHOLD)
+        self.assertEqual(result["is_defective"], expected["is_defective"], label)
+        self.assertEqual(result["spot_area"], expected["spot_area"], label)
+        self.assertEqual(len(result["contours"]), len(expected["contours"]), label)
+        for got, want in zip(result["contours"], expected["contours"]):
+            self.assertTrue(np.array_equal(got, want), label)
+        self.assertTrue(np.array_equal(spot_mask(image.shape, result["contours"]), spot_mask(image.shape, expected["contours"])), label)
+
+    def test_roi_matches_full_frame(self):
+        for label, image in self.cases:
+            with self.subTest(label):
+                self.assert_same(image, label)
+
+    def test_cases_cover_spots_at_border(self):
+        # Die Fälle müssen Flecken enthalten, deren Blackhat-Umgebung über den Bildrand reicht.
+        near_border = 0
+        defective = 0
+        for _, image in self.cases:
+            result = full_frame_defects(image, farb.SPOT_THRESHOLD)
+            defective += result["is_defective"]
+            height, width = image.shape[:2]
+            for cnt in result["contours"]:
+                x, y, w, h = cv2.boundingRect(cnt)
+                if min(x, y, width - x - w, height - y - h) < farb.ROI_PADDING:
+                    near_border += 1
+                    break
+        self.assertGreater(defective, len(self.cases) // 4)
+        self.assertGreaterEqual(near_border, MIN_BORDER_SPOTS)
+
+    def test_empty_image(self):
+        self.assert_same(np.zeros((400, 400, 3), np.uint8), "leeres Bild")
+
+
+if __name__ == '__main__':
+    unittest.main()
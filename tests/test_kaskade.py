@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import kaskade
+from tests.referenz import comparable, legacy_classify, warped_images
+
+COUNT = 12
+HEIGHT = 600
+SEED = 0
+
+
+class KaskadeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.images = warped_images(COUNT, HEIGHT, SEED)
+        cls.legacy = [legacy_classify(image) for image in cls.images]
+
+    def test_all_classes_covered(self):
+        self.assertEqual(set(r["category"] for r in self.legacy), {"Normal", "Bruch", "Rest", "Farbfehler"})
+
+    def test_cost_order_keeps_classes(self):
+        cascade = [kaskade.classify(image) for image in self.images]
+        self.assertEqual([r["category"] for r in cascade], [r["category"] for r in self.legacy])
+        self.assertEqual(Counter(r["category"] for r in cascade), Counter(r["category"] for r in self.legacy))
+
+    def test_legacy_order_keeps_records(self):
+        for image, expected in zip(self.images, self.legacy):
+            record = kaskade.classify(image, order=kaskade.LEGACY_ORDER)
+            self.assertEqual(comparable(record), comparable(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()